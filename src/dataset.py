@@ -0,0 +1,313 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from src.my_logger import Logger
+
+logger = Logger("dataset").on_duty()
+
+# Столбцы с датами и их формат в файле. В sidecar хранятся уже разобранными
+DATE_COLUMNS = {"Дата операции": "%d.%m.%Y %H:%M:%S", "Дата платежа": "%d.%m.%Y"}
+
+SIDECAR_MANIFEST = "manifest.json"
+
+
+class Dataset:
+    """
+    Загруженные данные об операциях одной версии файла.
+    Производные структуры (индексы, агрегаты) строятся один раз на версию через derived()
+    """
+
+    def __init__(self, file_path: str, version: tuple[int, int], frame: pd.DataFrame):
+        self.file_path = file_path
+        self.version = version
+        self.frame = frame
+        self._derived: dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def derived(self, key: str, builder: Callable[["Dataset"], Any]) -> Any:
+        """
+        Возвращает производную структуру данных, при первом обращении строит её функцией builder
+        :param key: Уникальное имя структуры
+        :param builder: Функция, принимающая Dataset и возвращающая структуру
+        :return: Построенная структура
+        """
+
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = builder(self)
+
+            return self._derived[key]
+
+    def dates(self, column: str) -> np.ndarray:
+        """
+        Возвращает разобранные даты столбца в виде массива datetime64[ns]. Пустые значения - NaT
+        :param column: Столбец из DATE_COLUMNS
+        :return: Массив дат в порядке строк файла
+        """
+        op_dates: np.ndarray = self.derived(
+            f"dates:{column}", lambda ds: parse_dates(ds.frame[column], DATE_COLUMNS[column])
+        )
+        return op_dates
+
+    @property
+    def records(self) -> list[dict]:
+        """
+        Данные в виде списка словарей. Пустые значения заменены на None
+        """
+        records: list[dict] = self.derived("records", lambda ds: ds.frame.replace({np.nan: None}).to_dict("records"))
+        return records
+
+
+class DatasetCache:
+    """
+    Потокобезопасный кэш загруженных файлов с операциями.
+    Ключ - путь до файла, версия - время изменения и размер файла.
+    Файл перечитывается только если он изменился
+    """
+
+    def __init__(self) -> None:
+        self._datasets: dict[str, Dataset] = {}
+        self._path_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, file_path: str) -> Dataset:
+        """
+        Возвращает данные из кэша, при отсутствии или изменении файла - считывает файл заново
+        :param file_path: Путь до файла с данными
+        :return: Dataset актуальной версии
+        """
+
+        path = os.path.abspath(file_path)
+
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+
+        # Пока один поток читает файл, остальные ждут его результата, а не читают файл параллельно
+        with path_lock:
+            version = get_file_version(path)
+            dataset = self._datasets.get(path)
+
+            if dataset is not None and dataset.version == version:
+                with self._lock:
+                    self.hits += 1
+                return dataset
+
+            new_dataset = _read_dataset(path, version)
+
+            with self._lock:
+                if dataset is None:
+                    self.misses += 1
+                else:
+                    self.reloads += 1
+                self._datasets[path] = new_dataset
+
+            return new_dataset
+
+    def stats(self) -> dict[str, int]:
+        """
+        Статистика работы кэша
+        :return: Словарь с количеством попаданий, промахов, перезагрузок и файлов в кэше
+        """
+
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "reloads": self.reloads, "size": len(self._datasets)}
+
+    def clear(self) -> None:
+        """
+        Очищает кэш и обнуляет статистику
+        """
+
+        with self._lock:
+            self._datasets.clear()
+            self.hits = self.misses = self.reloads = 0
+
+
+def get_file_version(file_path: str) -> tuple[int, int]:
+    """
+    Функция возвращает версию файла
+    :param file_path: Путь до файла
+    :return: (время изменения в наносекундах, размер в байтах)
+    """
+
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def parse_dates(column: pd.Series, date_format: str) -> np.ndarray:
+    """
+    Функция разбирает столбец с датами
+    :param column: Столбец с датами в виде строк
+    :param date_format: Формат даты
+    :return: Массив datetime64[ns]. Неразобранные значения - NaT
+    """
+    parsed: np.ndarray = pd.to_datetime(column, format=date_format, errors="coerce").to_numpy("datetime64[ns]")
+    return parsed
+
+
+def get_sidecar_path(file_path: str) -> str:
+    """
+    Функция возвращает путь до папки с колоночной копией файла (sidecar). Папка лежит рядом с файлом
+    :param file_path: Путь до excel файла
+    :return: Путь до папки sidecar
+    """
+    return os.path.splitext(file_path)[0] + ".cols"
+
+
+def write_sidecar(file_path: str, version: tuple[int, int], frame: pd.DataFrame, dates: dict) -> bool:
+    """
+    Функция сохраняет DataFrame в колоночном виде: по файлу .npy на столбец.
+    Числа хранятся как есть, строки - кодами словаря, даты - в разобранном виде.
+    Файлы .npy можно открыть через memory map, страницы разделяются между процессами
+    :param file_path: Путь до исходного excel файла
+    :param version: Версия исходного файла
+    :param frame: Считанные данные
+    :param dates: Разобранные столбцы с датами {Столбец: массив datetime64}
+    :return: True если sidecar записан
+    """
+
+    sidecar_path = get_sidecar_path(file_path)
+    # Каждая версия пишется в свою папку, чтобы читатели старой версии не увидели наполовину записанные файлы
+    version_dir = f"{version[0]}_{version[1]}"
+    columns = []
+    arrays = []
+
+    # Столбцы проверяются до записи, чтобы неподдерживаемый столбец не оставлял частично записанную папку
+    for idx, (name, values) in enumerate(frame.items()):
+        column: dict[str, Any] = {"name": name, "file": os.path.join(version_dir, f"{idx}.npy")}
+
+        if values.dtype.kind in "fiub":
+            column["kind"] = "numeric"
+            array = values.to_numpy()
+        elif values.map(lambda x: isinstance(x, str) or x is None or x != x).all():
+            # Кодируем строки словарём, пустые значения - код -1
+            codes, categories = pd.factorize(values)
+            column["kind"] = "dictionary"
+            column["categories"] = categories.tolist()
+            array = codes.astype(np.int32)
+        else:
+            logger.warning("Столбец %s не поддерживается sidecar. Файл %s не сохранён", name, file_path)
+            return False
+
+        columns.append(column)
+        arrays.append(array)
+
+    tmp_manifest = os.path.join(sidecar_path, f"{SIDECAR_MANIFEST}.{version_dir}.tmp")
+
+    try:
+        os.makedirs(os.path.join(sidecar_path, version_dir), exist_ok=True)
+
+        for column, array in zip(columns, arrays):
+            np.save(os.path.join(sidecar_path, column["file"]), array)
+
+        date_files: dict[str, str] = {}
+        for name, values in dates.items():
+            date_files[name] = os.path.join(version_dir, f"dates_{len(date_files)}.npy")
+            np.save(os.path.join(sidecar_path, date_files[name]), values)
+
+        manifest = {"version": list(version), "columns": columns, "dates": date_files}
+        with open(tmp_manifest, "w", encoding="utf8") as manifest_file:
+            json.dump(manifest, manifest_file, ensure_ascii=False)
+        os.replace(tmp_manifest, os.path.join(sidecar_path, SIDECAR_MANIFEST))
+
+    except OSError as error:
+        logger.warning("Не удалось сохранить sidecar для %s: %s", file_path, error)
+        # Частично записанная версия удаляется, манифест на неё не ссылается
+        shutil.rmtree(os.path.join(sidecar_path, version_dir), ignore_errors=True)
+        with contextlib.suppress(OSError):
+            os.remove(tmp_manifest)
+        return False
+
+    # Удаляем папки прошлых версий. Уже открытые memory map продолжают работать
+    for entry in os.listdir(sidecar_path):
+        entry_path = os.path.join(sidecar_path, entry)
+        if entry != version_dir and os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+    return True
+
+
+def read_sidecar(file_path: str, version: tuple[int, int]) -> tuple[pd.DataFrame, dict] | None:
+    """
+    Функция считывает колоночную копию файла, если она соответствует текущей версии файла
+    :param file_path: Путь до исходного excel файла
+    :param version: Текущая версия исходного файла
+    :return: (DataFrame, разобранные даты) или None, если sidecar отсутствует или устарел
+    """
+
+    sidecar_path = get_sidecar_path(file_path)
+    if not os.path.exists(os.path.join(sidecar_path, SIDECAR_MANIFEST)):
+        return None
+
+    try:
+        with open(os.path.join(sidecar_path, SIDECAR_MANIFEST), "r", encoding="utf8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        if tuple(manifest["version"]) != version:
+            return None
+
+        data = {}
+        for column in manifest["columns"]:
+            array = np.load(os.path.join(sidecar_path, column["file"]), mmap_mode="r")
+
+            if column["kind"] == "dictionary":
+                data[column["name"]] = pd.Categorical.from_codes(array, column["categories"]).astype(object)
+            else:
+                data[column["name"]] = array
+
+        dates = {
+            name: np.load(os.path.join(sidecar_path, date_file), mmap_mode="r")
+            for name, date_file in manifest["dates"].items()
+        }
+
+    except (OSError, ValueError, KeyError) as error:
+        logger.warning("Не удалось прочитать sidecar для %s: %s", file_path, error)
+        return None
+
+    # copy=False оставляет числовые столбцы в memory map, без копирования в общий блок
+    return pd.DataFrame(data, copy=False), dates
+
+
+def _read_dataset(file_path: str, version: tuple[int, int]) -> Dataset:
+    """
+    Функция считывает файл. Если есть актуальный sidecar - читает его, иначе excel файл и создаёт sidecar
+    :param file_path: Путь до файла с данными
+    :param version: Текущая версия файла
+    :return: Dataset
+    """
+
+    loaded = read_sidecar(file_path, version)
+
+    if loaded is None:
+        frame = pd.read_excel(file_path)
+        dates = {name: parse_dates(frame[name], fmt) for name, fmt in DATE_COLUMNS.items() if name in frame}
+        write_sidecar(file_path, version, frame, dates)
+    else:
+        frame, dates = loaded
+
+    dataset = Dataset(file_path, version, frame)
+    for name, values in dates.items():
+        dataset._derived[f"dates:{name}"] = values
+
+    return dataset
+
+
+operations_cache = DatasetCache()
+
+
+def load_dataset(file_path: str) -> Dataset:
+    """
+    Функция возвращает данные файла из общего кэша операций
+    :param file_path: Путь до файла с данными
+    :return: Dataset
+    """
+    return operations_cache.get(file_path)
@@ -1,34 +1,804 @@
+import atexit
+import contextlib
+import copy
+import hashlib
+import inspect
+import json
 import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from functools import wraps
-from typing import Callable
+from typing import Any, Callable, Hashable, Iterator, ParamSpec, TypeVar, cast
 
+import numpy as np
+import openpyxl  # type: ignore[import-untyped]
 import pandas as pd
 
 from config import DATA_DIR
+from src.dataset import Dataset, get_file_version
+from src.my_logger import Logger
+
+logger = Logger("decorators").on_duty()
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# DataFrame больше этого количества строк записываются в excel построчно, в режиме write-only
+EXCEL_STREAMING_ROWS = 50_000
+# Количество строк, записываемых за раз потоковыми форматами
+REPORT_CHUNK_ROWS = 10_000
 
 
 class ReportSaver:
 
+    # Количество потоков фоновой записи и максимальное количество записей в очереди
+    background_workers = 2
+    max_pending = 8
+
+    # Пул и очередь создаются при первой фоновой записи из текущих background_workers и max_pending
+    _executor: ThreadPoolExecutor | None = None
+    _slots: threading.BoundedSemaphore | None = None
+    _pending: set[Future] = set()
+    _lock = threading.Lock()
+    # Блокировки файлов: записи в один файл выполняются по очереди
+    _path_locks: dict[str, threading.Lock] = {}
+    _write_stats = {"written": 0, "skipped": 0}
+    # Последняя фоновая запись, поставленная в очередь текущим потоком
+    _local = threading.local()
+
     @staticmethod
-    def to_excel(file_name: str = "result_{func}.xls") -> Callable:
+    def save(
+        file_name: str = "result_{func}", fmt: str = "xlsx", background: bool = False, skip_unchanged: bool = True
+    ) -> Callable:
         """
-        Декоратор для сохранения результатов в файл.
-        :param file_name: Имя файла в которую будет сохранён результат. По умолчанию result_ИмяФункции.xls
+        Декоратор для сохранения результатов в файл заданного формата.
+        :param file_name: Имя файла в которую будет сохранён результат. По умолчанию result_ИмяФункции.
+            Расширение определяется форматом
+        :param fmt: Формат файла: xlsx, csv, jsonl или npz (сжатый колоночный)
+        :param background: Записывать файл в фоне. Функция возвращает результат сразу,
+            объект Future записи возвращает ReportSaver.last_write() в том же потоке сразу после вызова.
+            Результат Future - True если файл записан, False если запись пропущена
+        :param skip_unchanged: Не перезаписывать файл, если результат не изменился с прошлой записи.
+            Хэш результата хранится рядом с файлом, в файле .sha256
         :return: Результат работы функции
         """
 
+        if fmt not in REPORT_WRITERS:
+            raise ValueError(f"Неизвестный формат отчёта: {fmt}. Доступные форматы: {', '.join(REPORT_WRITERS)}")
+
+        write = REPORT_WRITERS[fmt]
+
         def wrapper(func: Callable) -> Callable:
             @wraps(func)
             def inner(*args: tuple, **kwargs: dict) -> pd.DataFrame:
 
                 result: pd.DataFrame = func(*args, **kwargs)
+                file_path = get_report_path(file_name.format(func=func.__name__), fmt)
 
-                result.to_excel(
-                    f"{os.path.join(DATA_DIR, file_name.format(func=func.__name__))}", index=False, engine="openpyxl"
-                )
+                if background:
+                    # Записываем копию, чтобы изменения результата после возврата не попали в файл
+                    snapshot = result.copy()
+                    ReportSaver.submit(
+                        lambda: ReportSaver.write_report(snapshot, file_path, write, skip_unchanged), file_path
+                    )
+                else:
+                    ReportSaver.write_report(result, file_path, write, skip_unchanged)
 
                 return result
 
             return inner
 
         return wrapper
+
+    @staticmethod
+    def to_excel(file_name: str = "result_{func}", background: bool = False, skip_unchanged: bool = True) -> Callable:
+        """
+        Декоратор для сохранения результатов в excel файл (.xlsx).
+        Большие DataFrame записываются потоково, в режиме write-only openpyxl
+        :param file_name: Имя файла в которую будет сохранён результат. По умолчанию result_ИмяФункции.xlsx
+        :param background: Записывать файл в фоне
+        :param skip_unchanged: Не перезаписывать файл, если результат не изменился
+        :return: Результат работы функции
+        """
+
+        return ReportSaver.save(file_name, "xlsx", background, skip_unchanged)
+
+    @staticmethod
+    def to_csv(file_name: str = "result_{func}", background: bool = False, skip_unchanged: bool = True) -> Callable:
+        """
+        Декоратор для сохранения результатов в csv файл. Строки записываются частями
+        :param file_name: Имя файла в которую будет сохранён результат. По умолчанию result_ИмяФункции.csv
+        :param background: Записывать файл в фоне
+        :param skip_unchanged: Не перезаписывать файл, если результат не изменился
+        :return: Результат работы функции
+        """
+
+        return ReportSaver.save(file_name, "csv", background, skip_unchanged)
+
+    @staticmethod
+    def to_jsonl(file_name: str = "result_{func}", background: bool = False, skip_unchanged: bool = True) -> Callable:
+        """
+        Декоратор для сохранения результатов в файл JSON Lines: по строке JSON на операцию
+        :param file_name: Имя файла в которую будет сохранён результат. По умолчанию result_ИмяФункции.jsonl
+        :param background: Записывать файл в фоне
+        :param skip_unchanged: Не перезаписывать файл, если результат не изменился
+        :return: Результат работы функции
+        """
+
+        return ReportSaver.save(file_name, "jsonl", background, skip_unchanged)
+
+    @staticmethod
+    def to_npz(file_name: str = "result_{func}", background: bool = False, skip_unchanged: bool = True) -> Callable:
+        """
+        Декоратор для сохранения результатов в сжатый колоночный файл .npz. Прочитать файл - read_npz_report
+        :param file_name: Имя файла в которую будет сохранён результат. По умолчанию result_ИмяФункции.npz
+        :param background: Записывать файл в фоне
+        :param skip_unchanged: Не перезаписывать файл, если результат не изменился
+        :return: Результат работы функции
+        """
+
+        return ReportSaver.save(file_name, "npz", background, skip_unchanged)
+
+    @classmethod
+    def write_report(
+        cls, frame: pd.DataFrame, file_path: str, write: Callable[[pd.DataFrame, str], None], skip_unchanged: bool
+    ) -> bool:
+        """
+        Записывает отчёт. Если хэш результата совпадает с сохранённым рядом с файлом - запись пропускается
+        :param frame: Результат
+        :param file_path: Путь до файла
+        :param write: Функция записи файла
+        :param skip_unchanged: Пропускать запись неизменившегося результата
+        :return: True если файл записан, False если запись пропущена
+        """
+
+        digest = get_frame_digest(frame) if skip_unchanged else None
+
+        with cls._get_path_lock(file_path):
+            return cls._write_report(frame, file_path, write, digest)
+
+    @classmethod
+    def _get_path_lock(cls, file_path: str) -> threading.Lock:
+        """
+        Блокировка файла отчёта
+        """
+
+        with cls._lock:
+            return cls._path_locks.setdefault(os.path.abspath(file_path), threading.Lock())
+
+    @classmethod
+    def _write_report(
+        cls, frame: pd.DataFrame, file_path: str, write: Callable[[pd.DataFrame, str], None], digest: str | None
+    ) -> bool:
+        """
+        Запись отчёта и его хэша. Вызывается под блокировкой файла
+        """
+
+        digest_path = f"{file_path}.sha256"
+
+        if digest is not None and os.path.exists(file_path) and _read_digest(digest_path) == digest:
+            with cls._lock:
+                cls._write_stats["skipped"] += 1
+            logger.info("Результат не изменился, запись %s пропущена", file_path)
+            return False
+
+        # Хэш прошлой записи удаляется до записи файла: если запись прервётся,
+        # наполовину записанный файл не будет считаться неизменившимся
+        if os.path.exists(digest_path):
+            os.remove(digest_path)
+
+        write(frame, file_path)
+
+        if digest is not None:
+            tmp_digest_path = f"{digest_path}.tmp"
+            with open(tmp_digest_path, "w", encoding="utf8") as digest_file:
+                digest_file.write(digest)
+            os.replace(tmp_digest_path, digest_path)
+
+        with cls._lock:
+            cls._write_stats["written"] += 1
+
+        return True
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        """
+        Статистика записи отчётов
+        :return: Словарь с количеством записанных и пропущенных файлов
+        """
+
+        with cls._lock:
+            return dict(cls._write_stats)
+
+    @classmethod
+    def submit(cls, write: Callable[[], Any], file_path: str) -> Future:
+        """
+        Ставит запись файла в очередь фоновой записи. Если очередь заполнена - ждёт освобождения места
+        :param write: Функция записи файла
+        :param file_path: Путь до файла, для сообщений в логе
+        :return: Future записи
+        """
+
+        with cls._lock:
+            if cls._executor is None or cls._slots is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.background_workers, thread_name_prefix="report")
+                cls._slots = threading.BoundedSemaphore(cls.max_pending)
+                atexit.register(cls.flush)
+            executor, slots = cls._executor, cls._slots
+
+        slots.acquire()
+
+        with cls._lock:
+            future = executor.submit(write)
+            cls._pending.add(future)
+
+        future.add_done_callback(lambda done: cls._on_write_done(done, file_path, slots))
+        cls._local.last_write = future
+
+        return future
+
+    @classmethod
+    def last_write(cls) -> Future | None:
+        """
+        Возвращает Future последней фоновой записи, поставленной в очередь текущим потоком
+        :return: Future записи или None, если поток ещё не ставил записи в очередь
+        """
+
+        last_write: Future | None = getattr(cls._local, "last_write", None)
+        return last_write
+
+    @classmethod
+    def _on_write_done(cls, future: Future, file_path: str, slots: threading.BoundedSemaphore) -> None:
+        """
+        Освобождает место в очереди и записывает ошибку записи в лог
+        """
+
+        with cls._lock:
+            cls._pending.discard(future)
+        slots.release()
+
+        error = future.exception()
+        if error is not None:
+            logger.error("Не удалось записать файл %s: %r", file_path, error)
+
+    @classmethod
+    def flush(cls, timeout: float | None = None) -> bool:
+        """
+        Ждёт завершения всех фоновых записей
+        :param timeout: Максимальное время ожидания в секундах. None - без ограничения
+        :return: True если все записи завершены
+        """
+
+        with cls._lock:
+            pending = list(cls._pending)
+
+        _, not_done = wait(pending, timeout=timeout)
+
+        return not not_done
+
+
+def get_report_path(file_name: str, fmt: str) -> str:
+    """
+    Функция возвращает путь до файла отчёта в папке data. Расширение определяется форматом,
+    расширение другого формата отчёта в имени файла заменяется
+    :param file_name: Имя файла
+    :param fmt: Формат файла
+    :return: Путь до файла
+    """
+
+    name, extension = os.path.splitext(file_name)
+    if extension.lstrip(".") not in REPORT_EXTENSIONS:
+        name = file_name
+
+    return os.path.join(DATA_DIR, f"{name}.{fmt}")
+
+
+def get_frame_digest(frame: pd.DataFrame) -> str | None:
+    """
+    Функция возвращает хэш sha256 DataFrame: столбцов, типов и значений
+    :param frame: DataFrame
+    :return: Хэш в шестнадцатеричном виде или None если значения не хэшируются
+    """
+
+    digest = hashlib.sha256()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in frame.dtypes.items()]).encode("utf8"))
+
+    try:
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    except TypeError as error:
+        logger.warning("Не удалось вычислить хэш результата: %s", error)
+        return None
+
+    return digest.hexdigest()
+
+
+def _read_digest(digest_path: str) -> str | None:
+    """
+    Чтение сохранённого хэша отчёта. None если хэш не сохранён
+    """
+
+    try:
+        with open(digest_path, encoding="utf8") as digest_file:
+            return digest_file.read().strip()
+    except OSError:
+        return None
+
+
+def _write_excel(frame: pd.DataFrame, file_path: str) -> None:
+    """
+    Запись excel файла. DataFrame больше EXCEL_STREAMING_ROWS строк записывается построчно
+    в режиме write-only openpyxl, без построения всего листа в памяти
+    """
+
+    if len(frame) <= EXCEL_STREAMING_ROWS:
+        frame.to_excel(file_path, index=False, engine="openpyxl")
+        return
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([str(column) for column in frame.columns])
+
+    for chunk in _iter_chunks(frame):
+        values = chunk.to_numpy(dtype=object)
+        # Пустые значения записываются пустыми ячейками
+        values[pd.isna(values)] = None
+        for row in values:
+            sheet.append(row.tolist())
+
+    workbook.save(file_path)
+
+
+def _iter_chunks(frame: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    """
+    Генератор частей DataFrame по REPORT_CHUNK_ROWS строк
+    """
+
+    for start in range(0, len(frame), REPORT_CHUNK_ROWS):
+        stop = start + REPORT_CHUNK_ROWS
+        yield frame.iloc[start:stop]
+
+
+def _write_csv(frame: pd.DataFrame, file_path: str) -> None:
+    """
+    Запись csv файла частями по REPORT_CHUNK_ROWS строк
+    """
+
+    frame.to_csv(file_path, index=False, chunksize=REPORT_CHUNK_ROWS, encoding="utf8")
+
+
+def _write_jsonl(frame: pd.DataFrame, file_path: str) -> None:
+    """
+    Запись файла JSON Lines частями по REPORT_CHUNK_ROWS строк. Даты записываются в формате ISO
+    """
+
+    with open(file_path, "w", encoding="utf8") as file:
+        for chunk in _iter_chunks(frame):
+            file.write(chunk.to_json(orient="records", lines=True, force_ascii=False, date_format="iso"))
+
+
+def _write_npz(frame: pd.DataFrame, file_path: str) -> None:
+    """
+    Запись сжатого колоночного файла .npz: по массиву на столбец.
+    Числа и даты хранятся как есть, остальные значения - кодами словаря (пустые значения - код -1)
+    """
+
+    arrays = {"columns": np.array([str(column) for column in frame.columns])}
+
+    for idx, (_, values) in enumerate(frame.items()):
+        if values.dtype.kind in "fiubmM":
+            arrays[f"values_{idx}"] = values.to_numpy()
+        else:
+            codes, categories = pd.factorize(values)
+            arrays[f"codes_{idx}"] = codes.astype(np.int32)
+            arrays[f"categories_{idx}"] = np.array([str(category) for category in categories], dtype=str)
+
+    np.savez_compressed(file_path, **arrays)  # type: ignore[arg-type]
+
+
+def read_npz_report(file_path: str) -> pd.DataFrame:
+    """
+    Функция считывает отчёт, сохранённый в формате npz
+    :param file_path: Путь до файла
+    :return: DataFrame
+    """
+
+    with np.load(file_path) as report:
+        frame = {}
+        for idx, column in enumerate(report["columns"]):
+            if f"values_{idx}" in report:
+                frame[str(column)] = report[f"values_{idx}"]
+            else:
+                # Код -1 указывает на добавленный в конец словаря None
+                categories = np.append(report[f"categories_{idx}"].astype(object), [None])
+                frame[str(column)] = categories[report[f"codes_{idx}"]]
+
+    return pd.DataFrame(frame)
+
+
+REPORT_WRITERS: dict[str, Callable[[pd.DataFrame, str], None]] = {
+    "xlsx": _write_excel,
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "npz": _write_npz,
+}
+# Расширения, которые заменяются расширением формата. xls - имя файла по умолчанию в прошлых версиях
+REPORT_EXTENSIONS = {*REPORT_WRITERS, "xls"}
+
+# Кэши результатов функций, обёрнутых декоратором cached: {Имя функции: кэш}
+result_caches: dict[str, "ResultCache"] = {}
+
+
+class ResultCache:
+    """
+    LRU кэш результатов функции в памяти с ограничением по количеству записей и по размеру в байтах
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 256 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "bypasses": 0}
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """
+        Возвращает результат из кэша
+        :param key: Ключ
+        :return: (True, результат) если результат есть в кэше, иначе (False, None)
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Сохраняет результат в кэш. Давно не использованные записи вытесняются
+        :param key: Ключ
+        :param value: Результат
+        """
+
+        size = _get_result_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._bytes -= old_entry[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def bypass(self) -> None:
+        """
+        Учитывает вызов, аргументы которого не удалось привести к ключу
+        """
+
+        with self._lock:
+            self._stats["bypasses"] += 1
+
+    def stats(self) -> dict[str, float]:
+        """
+        Статистика работы кэша
+        :return: Словарь с количеством попаданий, промахов, вытеснений, записей, размером и долей попаданий
+        """
+
+        with self._lock:
+            stats: dict[str, float] = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            requests_count = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / requests_count if requests_count else 0.0
+
+        return stats
+
+    def clear(self) -> None:
+        """
+        Очищает кэш и обнуляет статистику
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._stats = dict.fromkeys(self._stats, 0)
+
+
+def cached(
+    max_entries: int = 128,
+    max_bytes: int = 256 * 2**20,
+    path_arg: str | None = None,
+    path: str | None = None,
+    context: Callable[[], Hashable] | None = None,
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Декоратор для кэширования результатов функций, которые зависят только от аргументов и файла с операциями.
+    Ключ - аргументы функции и версия файла, поэтому при изменении файла результаты считаются заново.
+    DataFrame аргументы учитываются по хэшу содержимого, Dataset - по пути и версии файла.
+    Возвращается копия результата из кэша.
+    Кэш и его статистика доступны в атрибуте cache декорированной функции
+    :param max_entries: Максимальное количество результатов в кэше
+    :param max_bytes: Максимальный примерный размер результатов в кэше в байтах
+    :param path_arg: Имя аргумента функции с путём до файла
+    :param path: Путь до файла, который функция читает сама
+    :param context: Функция, значение которой добавляется в ключ. Например, текущая дата
+    :return: Результат работы функции
+    """
+
+    def wrapper(func: Callable[P, R]) -> Callable[P, R]:
+        signature = inspect.signature(func)
+        cache = ResultCache(max_entries, max_bytes)
+
+        @wraps(func)
+        def inner(*args: P.args, **kwargs: P.kwargs) -> R:
+
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+
+                key: list[Hashable] = [_normalize_argument(value) for value in bound.arguments.values()]
+                file_path = bound.arguments[path_arg] if path_arg else path
+                if file_path is not None:
+                    key.append(get_file_version(file_path))
+                if context is not None:
+                    key.append(context())
+
+                cache_key = tuple(key)
+                hash(cache_key)
+            except (TypeError, OSError):
+                cache.bypass()
+                return func(*args, **kwargs)
+
+            found, result = cache.get(cache_key)
+            if not found:
+                result = func(*args, **kwargs)
+                cache.put(cache_key, result)
+
+            return cast(R, _copy_result(result))
+
+        inner.cache = cache  # type: ignore[attr-defined]
+        result_caches[func.__qualname__] = cache
+
+        return inner
+
+    return wrapper
+
+
+def get_cache_stats() -> dict[str, dict[str, float]]:
+    """
+    Функция возвращает статистику кэшей всех функций, обёрнутых декоратором cached
+    :return: Словарь {Имя функции: статистика кэша}
+    """
+
+    return {name: cache.stats() for name, cache in result_caches.items()}
+
+
+def clear_caches() -> None:
+    """
+    Функция очищает кэши всех функций, обёрнутых декоратором cached
+    """
+
+    for cache in result_caches.values():
+        cache.clear()
+
+
+def _normalize_argument(value: Any) -> Hashable:
+    """
+    Приводит аргумент к хэшируемому значению для ключа кэша. TypeError если аргумент не поддерживается.
+    DataFrame хэшируется по содержимому при каждом вызове, Dataset - по пути и версии файла
+    """
+
+    if isinstance(value, Dataset):
+        return "Dataset", value.file_path, value.version
+    if isinstance(value, pd.DataFrame):
+        fingerprint = get_frame_digest(value)
+        if fingerprint is None:
+            raise TypeError("DataFrame не хэшируется")
+        return "DataFrame", fingerprint
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_normalize_argument(item) for item in value)
+    if isinstance(value, dict):
+        return "dict", tuple(sorted((key, _normalize_argument(item)) for key, item in value.items()))
+
+    hashable: Hashable = value
+    hash(hashable)
+    return hashable
+
+
+def _get_result_size(value: Any) -> int:
+    """
+    Примерный размер результата в байтах
+    """
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(_get_result_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value.values())
+
+    return sys.getsizeof(value)
+
+
+def _copy_result(value: Any) -> Any:
+    """
+    Копия результата из кэша, чтобы изменения у вызывающего не попали в кэш
+    """
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+        return [dict(item) for item in value]
+
+    return copy.deepcopy(value)
+
+
+class Profiler:
+    """
+    Сбор времени выполнения функций и этапов в памяти: реальное время, процессорное время потока
+    и опционально пиковая память (tracemalloc). По каждому имени хранятся последние max_samples замеров.
+    Выключенный профилировщик не делает замеров
+    """
+
+    def __init__(self, max_samples: int = 10_000):
+        self.enabled = False
+        self.trace_memory = False
+        self.max_samples = max_samples
+        self._samples: dict[str, dict[str, deque]] = {}
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._null_stage = contextlib.nullcontext()
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """
+        Включает профилировщик
+        :param trace_memory: Замерять пиковую память вызовов. Замедляет работу всех функций, пока включено
+        """
+
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Выключает профилировщик. Собранные замеры сохраняются
+        """
+
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def stage(self, name: str) -> contextlib.AbstractContextManager:
+        """
+        Контекстный менеджер для замера этапа внутри функции
+        :param name: Имя этапа
+        :return: Контекстный менеджер
+        """
+
+        if not self.enabled:
+            return self._null_stage
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        trace_memory = self.trace_memory and tracemalloc.is_tracing()
+        if trace_memory:
+            # Пик вложенного замера сбрасывает пик внешнего, поэтому память внешних замеров - оценка снизу
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            peak = tracemalloc.get_traced_memory()[1] - start_memory if trace_memory else None
+            self.record(name, wall, cpu, peak)
+
+    def record(self, name: str, wall: float, cpu: float, memory_peak: int | None = None) -> None:
+        """
+        Сохраняет замер
+        :param name: Имя функции или этапа
+        :param wall: Реальное время в секундах
+        :param cpu: Процессорное время в секундах
+        :param memory_peak: Пиковая память в байтах
+        """
+
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = {
+                    "wall": deque(maxlen=self.max_samples),
+                    "cpu": deque(maxlen=self.max_samples),
+                    "memory_peak": deque(maxlen=self.max_samples),
+                }
+                self._samples[name] = samples
+                self._counts[name] = 0
+
+            self._counts[name] += 1
+            samples["wall"].append(wall)
+            samples["cpu"].append(cpu)
+            if memory_peak is not None:
+                samples["memory_peak"].append(memory_peak)
+
+    def dump(self, file_path: str | None = None) -> dict[str, dict]:
+        """
+        Возвращает статистику замеров и опционально сохраняет её в JSON файл
+        :param file_path: Путь до файла. None - не сохранять
+        :return: Словарь {Имя: {"count": количество вызовов, "wall"/"cpu"/"memory_peak": {p50, p95, p99, max}}}
+        """
+
+        with self._lock:
+            snapshot = {
+                name: {kind: list(values) for kind, values in samples.items()}
+                for name, samples in self._samples.items()
+            }
+            counts = dict(self._counts)
+
+        result: dict[str, dict] = {}
+        for name, samples in snapshot.items():
+            result[name] = {"count": counts[name]}
+            for kind, values in samples.items():
+                if values:
+                    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                    result[name][kind] = {"p50": p50, "p95": p95, "p99": p99, "max": max(values)}
+
+        if file_path is not None:
+            with open(file_path, "w", encoding="utf8") as file:
+                json.dump(result, file, ensure_ascii=False, indent=4, default=float)
+
+        return result
+
+    def reset(self) -> None:
+        """
+        Удаляет все замеры
+        """
+
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+profiler = Profiler()
+
+
+def profiled(func: Callable[P, R]) -> Callable[P, R]:
+    """
+    Декоратор для замера времени выполнения функции профилировщиком profiler.
+    Пока профилировщик выключен, функция вызывается без замеров
+    :param func: Функция
+    :return: Результат работы функции
+    """
+
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def inner(*args: P.args, **kwargs: P.kwargs) -> R:
+
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+
+        with profiler.stage(name):
+            return func(*args, **kwargs)
+
+    return inner
@@ -1,22 +1,392 @@
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Literal
 
 from config import LOGS_DIR
 
+# Максимальное количество записей в очереди логов
+LOG_QUEUE_SIZE = 10_000
+
+OverflowPolicy = Literal["drop_new", "drop_oldest", "block"]
+Rotation = Literal["size", "time"]
+
+LOG_FORMAT = "%(name)s - %(funcName)s: %(message)s"
+
+# Типы аргументов записи, которые можно форматировать в фоновом потоке
+IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
 
 class Logger:
 
-    def __init__(self, logger_name: str, save_dir: str = LOGS_DIR, mode: str = "w", level: int = 10):
+    def __init__(
+        self,
+        logger_name: str,
+        save_dir: str = LOGS_DIR,
+        mode: str = "w",
+        level: int = 10,
+        queued: bool = False,
+        overflow: OverflowPolicy = "drop_new",
+        rotation: Rotation | None = None,
+        max_bytes: int = 10 * 2**20,
+        when: str = "midnight",
+        backup_count: int = 5,
+        buffered: bool = False,
+        buffer_capacity: int = 1000,
+        flush_interval: float = 5.0,
+    ):
+        """
+        :param logger_name: Имя логгера и файла лога
+        :param save_dir: Папка для файла лога
+        :param mode: Режим открытия файла лога
+        :param level: Уровень логирования
+        :param queued: Передавать записи через очередь в общий фоновый поток, который пишет их в файл.
+            Вызывающий поток не ждёт форматирования и записи в файл
+        :param overflow: Что делать при заполненной очереди: drop_new - отбросить новую запись,
+            drop_oldest - отбросить самую старую, block - ждать места. Записи ERROR и выше всегда ждут места
+        :param rotation: Ротация файла лога: size - по размеру, time - по времени. None - без ротации.
+            При ротации файл открывается на дозапись
+        :param max_bytes: Размер файла в байтах, после которого начинается новый файл (rotation="size")
+        :param when: Интервал ротации в формате TimedRotatingFileHandler (rotation="time")
+        :param backup_count: Количество хранимых старых файлов лога
+        :param buffered: Копить записи в памяти и писать в файл пачкой: при заполнении буфера,
+            раз в flush_interval секунд или сразу при записи уровня ERROR и выше
+        :param buffer_capacity: Количество записей в буфере
+        :param flush_interval: Интервал записи буфера в файл в секундах
+        """
 
         self.logger = logging.getLogger(logger_name)
         self.logger.setLevel(level)
-        self.handler = logging.FileHandler(
-            str(os.path.join(save_dir, logger_name + ".log")), mode=mode, encoding="utf8"
-        )
-        self.formatter = logging.Formatter("%(name)s - %(funcName)s: %(message)s")
+        self.key = (logger_name, os.path.abspath(save_dir))
+
+        # Обработчики переиспользуются: повторное создание Logger не открывает файл повторно
+        config = (mode, rotation, max_bytes, when, backup_count, buffered, buffer_capacity, flush_interval)
+
+        with _registry_lock:
+            self.handler = _file_handlers.get(self.key)
+
+            if self.handler is not None and _handler_configs[self.key] != config:
+                raise ValueError(
+                    f"Логгер {logger_name} для папки {save_dir} уже создан с другими настройками файла лога. "
+                    "Закройте его методом close(), чтобы создать с новыми"
+                )
+
+            if self.handler is None:
+                file_path = os.path.join(save_dir, logger_name + ".log")
+
+                file_handler: logging.FileHandler
+                if rotation == "size":
+                    file_handler = RotatingFileHandler(
+                        file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf8"
+                    )
+                elif rotation == "time":
+                    file_handler = TimedRotatingFileHandler(
+                        file_path, when=when, backupCount=backup_count, encoding="utf8"
+                    )
+                else:
+                    file_handler = logging.FileHandler(file_path, mode=mode, encoding="utf8")
+                file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+                self.handler = file_handler
+                if buffered:
+                    self.handler = IntervalMemoryHandler(buffer_capacity, flush_interval, file_handler)
 
-        self.handler.setFormatter(self.formatter)
-        self.logger.addHandler(self.handler)
+                _file_handlers[self.key] = self.handler
+                _handler_configs[self.key] = config
+
+            # Обработчик подключается либо напрямую, либо через очередь, но не обоими способами
+            if queued:
+                self.logger.removeHandler(self.handler)
+                _router.add_handler(logger_name, self.handler)
+                if not any(isinstance(handler, BoundedQueueHandler) for handler in self.logger.handlers):
+                    self.logger.addHandler(BoundedQueueHandler(get_log_queue(), overflow))
+            elif self.handler not in self.logger.handlers:
+                if self.handler in _router.handlers.get(logger_name, []):
+                    # Записи, уже попавшие в очередь, дописываются до переключения
+                    flush_queue()
+                    _router.remove_handler(logger_name, self.handler)
+                    _remove_queue_handler(self.logger)
+                self.logger.addHandler(self.handler)
+
+        self.formatter = logging.Formatter(LOG_FORMAT)
 
     def on_duty(self) -> logging.Logger:
         return self.logger
+
+    def close(self) -> None:
+        """
+        Отключает от логгера и закрывает файловый обработчик этого имени и папки.
+        Следующий Logger с тем же именем и папкой откроет файл заново
+        """
+
+        close_handler(self.key)
+
+
+class IntervalMemoryHandler(MemoryHandler):
+    """
+    Буфер записей в памяти. Записи передаются в файловый обработчик при заполнении буфера,
+    при записи уровня ERROR и выше и не реже чем раз в flush_interval секунд
+    """
+
+    def __init__(self, capacity: int, flush_interval: float, target: logging.Handler):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target, flushOnClose=True)
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        _buffer_flusher.add(self)
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or time.monotonic() - self.last_flush >= self.flush_interval
+
+    def flush(self) -> None:
+        super().flush()
+        self.last_flush = time.monotonic()
+
+    def close(self) -> None:
+        _buffer_flusher.discard(self)
+        target = self.target
+        super().close()
+        if target is not None:
+            target.close()
+
+
+class BufferFlusher:
+    """
+    Фоновый поток, который записывает буферы IntervalMemoryHandler, если в них давно не было новых записей
+    """
+
+    def __init__(self) -> None:
+        self.handlers: set[IntervalMemoryHandler] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def add(self, handler: IntervalMemoryHandler) -> None:
+        with self._lock:
+            self.handlers.add(handler)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log_buffer_flusher", daemon=True)
+                self._thread.start()
+
+    def discard(self, handler: IntervalMemoryHandler) -> None:
+        with self._lock:
+            self.handlers.discard(handler)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                handlers = list(self.handlers)
+            interval = min((handler.flush_interval for handler in handlers), default=1.0)
+            time.sleep(interval / 2)
+
+            now = time.monotonic()
+            for handler in handlers:
+                if now - handler.last_flush >= handler.flush_interval:
+                    handler.flush()
+
+
+_buffer_flusher = BufferFlusher()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Обработчик, который кладёт записи в ограниченную очередь, не форматируя их.
+    Записи форматируются и пишутся в файл в потоке QueueListener
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: OverflowPolicy = "drop_new"):
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение с неизменяемыми аргументами форматируется в фоновом потоке.
+        # Сообщение с изменяемыми объектами форматируется сразу, иначе их изменения после вызова логгера попадут в лог
+        args = record.args if isinstance(record.args, tuple) else (record.args,)
+        if not isinstance(record.msg, str) or not all(isinstance(arg, IMMUTABLE_ARGS) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.log_queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow == "block" or record.levelno >= logging.ERROR:
+            self.log_queue.put(record)
+            return
+
+        if self.overflow == "drop_oldest":
+            try:
+                self.log_queue.get_nowait()
+                # Отброшенная запись считается обработанной, иначе join() очереди не завершится
+                self.log_queue.task_done()
+            except queue.Empty:
+                pass
+            try:
+                self.log_queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+
+        self.dropped += 1
+
+
+class RoutingHandler(logging.Handler):
+    """
+    Обработчик фонового потока: передаёт запись файловому обработчику логгера с тем же именем
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.handlers: dict[str, list[logging.Handler]] = {}
+        self._lock = threading.Lock()
+
+    def add_handler(self, logger_name: str, handler: logging.Handler) -> None:
+        with self._lock:
+            handlers = self.handlers.get(logger_name, [])
+            if handler not in handlers:
+                self.handlers[logger_name] = [*handlers, handler]
+
+    def remove_handler(self, logger_name: str, handler: logging.Handler) -> None:
+        with self._lock:
+            handlers = [item for item in self.handlers.get(logger_name, []) if item is not handler]
+            if handlers:
+                self.handlers[logger_name] = handlers
+            else:
+                self.handlers.pop(logger_name, None)
+
+    def all_handlers(self) -> list[logging.Handler]:
+        with self._lock:
+            return [handler for handlers in self.handlers.values() for handler in handlers]
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        handlers = self.handlers.get(record.name, [])
+        for handler in handlers:
+            handler.handle(record)
+
+        return bool(handlers)
+
+
+class BlockingQueueListener(QueueListener):
+    """
+    QueueListener для ограниченной очереди: при остановке ждёт места для завершающей записи
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)  # type: ignore[attr-defined]
+
+
+_router = RoutingHandler()
+# Файловые обработчики: {(Имя логгера, папка): обработчик}
+_file_handlers: dict[tuple[str, str], logging.Handler] = {}
+# Настройки файловых обработчиков: {(Имя логгера, папка): настройки}
+_handler_configs: dict[tuple[str, str], tuple] = {}
+_registry_lock = threading.Lock()
+_log_queue: queue.Queue | None = None
+_listener: QueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+def get_log_queue() -> queue.Queue:
+    """
+    Функция возвращает общую очередь логов. При первом вызове запускается фоновый поток записи
+    :return: Очередь логов
+    """
+
+    global _log_queue, _listener
+
+    with _listener_lock:
+        if _log_queue is None:
+            _log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        if _listener is None:
+            _listener = BlockingQueueListener(_log_queue, _router)
+            _listener.start()
+            atexit.register(stop_listener)
+
+        return _log_queue
+
+
+def flush_queue() -> None:
+    """
+    Функция ждёт, пока фоновый поток запишет все записи из очереди
+    """
+
+    with _listener_lock:
+        if _log_queue is None or _listener is None:
+            return
+        log_queue = _log_queue
+
+    log_queue.join()
+    for handler in _router.all_handlers():
+        handler.flush()
+
+
+def stop_listener() -> None:
+    """
+    Функция дописывает оставшиеся в очереди записи и останавливает фоновый поток записи
+    """
+
+    global _listener
+
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+    for handler in _router.all_handlers():
+        handler.flush()
+
+
+def close_handler(key: tuple[str, str]) -> None:
+    """
+    Функция отключает от логгера и закрывает файловый обработчик
+    :param key: (Имя логгера, абсолютный путь до папки)
+    """
+
+    # Записи, ещё не записанные фоновым потоком, дописываются до закрытия файла
+    flush_queue()
+
+    with _registry_lock:
+        handler = _file_handlers.pop(key, None)
+        _handler_configs.pop(key, None)
+        if handler is None:
+            return
+
+        logger_name = key[0]
+        logger = logging.getLogger(logger_name)
+        logger.removeHandler(handler)
+        _router.remove_handler(logger_name, handler)
+
+        _remove_queue_handler(logger)
+
+    handler.close()
+
+
+def _remove_queue_handler(logger: logging.Logger) -> None:
+    """
+    Отключает от логгера обработчик очереди, если у логгера не осталось файлов в очереди
+    """
+
+    if logger.name not in _router.handlers:
+        for queue_handler in [item for item in logger.handlers if isinstance(item, BoundedQueueHandler)]:
+            logger.removeHandler(queue_handler)
+
+
+def shutdown() -> None:
+    """
+    Функция дописывает очередь логов, останавливает фоновый поток и закрывает все файловые обработчики
+    """
+
+    stop_listener()
+
+    with _registry_lock:
+        keys = list(_file_handlers)
+    for key in keys:
+        close_handler(key)
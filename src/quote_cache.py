@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable
+
+from src.my_logger import Logger
+
+logger = Logger("quote_cache").on_duty()
+
+
+class QuoteCache:
+    """
+    Кэш котировок в памяти с временем жизни (TTL).
+    Устаревшее значение сразу возвращается, а в фоне запускается его обновление (stale-while-revalidate).
+    Если значение старше max_staleness - вызывающий ждёт нового запроса
+    """
+
+    def __init__(self, refresh_workers: int = 4):
+        self._entries: dict[Hashable, tuple[float | None, float]] = {}
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="quote_refresh")
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+        self._refresh_time = {"total": 0.0, "max": 0.0}
+
+    def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], float | None],
+        ttl: float,
+        max_staleness: float | None = None,
+    ) -> float | None:
+        """
+        Возвращает котировку из кэша или запрашивает её
+        :param key: Ключ котировки, например (символ, валюта)
+        :param fetch: Функция запроса котировки. None - котировку получить не удалось
+        :param ttl: Время в секундах, в течение которого значение считается свежим
+        :param max_staleness: Время в секундах, после которого устаревшее значение не возвращается.
+            None - без ограничения
+        :return: Котировка или None
+        """
+
+        return self.get_many([key], lambda keys: {key: fetch()}, ttl, max_staleness)[key]
+
+    def get_many(
+        self,
+        keys: list[Hashable],
+        fetch_many: Callable[[list[Hashable]], dict[Hashable, float | None]],
+        ttl: float,
+        max_staleness: float | None = None,
+    ) -> dict[Hashable, float | None]:
+        """
+        Возвращает котировки по нескольким ключам. Отсутствующие и устаревшие котировки
+        запрашиваются одним вызовом fetch_many
+        :param keys: Ключи котировок
+        :param fetch_many: Функция запроса котировок по списку ключей. Возвращает словарь {ключ: котировка}
+        :param ttl: Время в секундах, в течение которого значение считается свежим
+        :param max_staleness: Время в секундах, после которого устаревшее значение не возвращается.
+            None - без ограничения
+        :return: Словарь {ключ: котировка или None}
+        """
+
+        result: dict[Hashable, float | None] = {}
+        missing = []
+        stale = []
+
+        with self._lock:
+            now = time.monotonic()
+
+            for key in keys:
+                entry = self._entries.get(key)
+
+                if entry is not None and now - entry[1] < ttl:
+                    self._stats["hits"] += 1
+                    result[key] = entry[0]
+                elif entry is not None and (max_staleness is None or now - entry[1] < max_staleness):
+                    self._stats["stale_hits"] += 1
+                    result[key] = entry[0]
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        stale.append(key)
+                else:
+                    self._stats["misses"] += 1
+                    missing.append(key)
+
+            if stale:
+                self._executor.submit(self._background_refresh_many, stale, fetch_many)
+
+        if missing:
+            result.update(self._refresh_many(missing, fetch_many))
+
+        return {key: result.get(key) for key in keys}
+
+    def _refresh_many(
+        self, keys: list[Hashable], fetch_many: Callable[[list[Hashable]], dict[Hashable, float | None]]
+    ) -> dict[Hashable, float | None]:
+        """
+        Запрашивает котировки по нескольким ключам одним вызовом и сохраняет их в кэш
+        """
+
+        started = time.perf_counter()
+        values = fetch_many(keys)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._stats["refreshes"] += 1
+            self._refresh_time["total"] += elapsed
+            self._refresh_time["max"] = max(self._refresh_time["max"], elapsed)
+
+            fetched_at = time.monotonic()
+            for key, value in values.items():
+                if value is not None:
+                    self._entries[key] = (value, fetched_at)
+
+        return values
+
+    def _background_refresh_many(
+        self, keys: list[Hashable], fetch_many: Callable[[list[Hashable]], dict[Hashable, float | None]]
+    ) -> None:
+        """
+        Обновление нескольких котировок в фоне. Ошибки записываются в лог
+        """
+
+        try:
+            self._refresh_many(keys, fetch_many)
+        except Exception as error:
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+            logger.error("Не удалось обновить котировки %s: %s", keys, error)
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(keys)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Статистика работы кэша
+        :return: Словарь с количеством попаданий, промахов, обновлений, долей попаданий и временем обновления
+        """
+
+        with self._lock:
+            stats: dict[str, float] = dict(self._stats)
+            requests_count = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / requests_count if requests_count else 0.0
+            stats["refresh_latency_avg"] = (
+                self._refresh_time["total"] / stats["refreshes"] if stats["refreshes"] else 0.0
+            )
+            stats["refresh_latency_max"] = self._refresh_time["max"]
+
+        return stats
+
+    def clear(self) -> None:
+        """
+        Очищает кэш и обнуляет статистику
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+            self._refresh_time = {"total": 0.0, "max": 0.0}
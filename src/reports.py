@@ -1,18 +1,170 @@
 import datetime
+import hashlib
+import threading
+from collections import OrderedDict
 
+import numpy as np
 import pandas as pd
 
+from src.dataset import Dataset
+from src.decorators import cached, profiled
 
-def spending_by_category(transactions: pd.DataFrame, category: str, date: str | None = None) -> pd.DataFrame:
+# Столбцы, по которым строится индекс категорий
+INDEX_COLUMNS = ["Дата операции", "Категория"]
+# Количество хранимых индексов для DataFrame, переданных не через Dataset
+CATEGORY_INDEX_ENTRIES = 8
+
+# Индексы DataFrame по категориям: {отпечаток столбцов INDEX_COLUMNS: индекс}
+_category_indexes: OrderedDict[str, dict] = OrderedDict()
+_category_indexes_lock = threading.Lock()
+
+
+# Окно без переданной даты зависит от текущего дня, поэтому день добавляется в ключ кэша
+@profiled
+@cached(context=datetime.date.today)
+def spending_by_category(transactions: pd.DataFrame | Dataset, category: str, date: str | None = None) -> pd.DataFrame:
     """
     Функция возвращает траты по заданной категории за последние три месяца (от переданной даты)
+    Переданный DataFrame не изменяется. Для Dataset даты разбираются и строки делятся по категориям
+    один раз на версию файла, для DataFrame - один раз на содержимое столбцов даты и категории
 
-    :param transactions: Принимает на вход DataFrame
+    :param transactions: Принимает на вход DataFrame или Dataset из load_dataset
     :param category: Ищет, категорию среди переданных данных
     :param date: Опционально. Дата в формате День.Месяц.Год. Если не определена - текущая дата
     :return:
     """
 
+    left_date, right_date = _get_date_window(date)
+
+    category_index = get_category_index(transactions)
+    if category not in category_index["categories"]:
+        return _take_rows(transactions, category_index, np.array([], dtype=int))
+
+    # Бинарным поиском отбираем операции категории с начала левого дня по начало правого дня включительно
+    positions, op_dates = category_index["categories"][category]
+    left = np.searchsorted(op_dates, left_date, side="left")
+    right = np.searchsorted(op_dates, right_date, side="right")
+
+    return _take_rows(transactions, category_index, np.sort(positions[left:right]))
+
+
+@profiled
+def spending_by_categories(
+    transactions: pd.DataFrame | Dataset, categories: list[str], dates: list[str | None]
+) -> pd.DataFrame:
+    """
+    Функция возвращает траты по нескольким категориям за последние три месяца от каждой из переданных дат.
+    Результат совпадает с объединением spending_by_category по всем парам (дата, категория),
+    но DataFrame делится по категориям один раз, а каждое окно находится бинарным поиском
+
+    :param transactions: Принимает на вход DataFrame или Dataset из load_dataset
+    :param categories: Категории
+    :param dates: Даты в формате День.Месяц.Год. None - текущая дата
+    :return: DataFrame в длинном формате: столбец "Дата отчёта" и строки операций, по датам и категориям
+    """
+
+    category_index = get_category_index(transactions)
+    selected = []
+    report_dates = []
+
+    for date in dates:
+        left_date, right_date = _get_date_window(date)
+        report_date = date or datetime.datetime.now().strftime("%d.%m.%Y")
+
+        for category in categories:
+            if category not in category_index["categories"]:
+                continue
+
+            positions, op_dates = category_index["categories"][category]
+            left = np.searchsorted(op_dates, left_date, side="left")
+            right = np.searchsorted(op_dates, right_date, side="right")
+
+            selected.append(np.sort(positions[left:right]))
+            report_dates.append(np.full(right - left, report_date, dtype=object))
+
+    if not selected:
+        selected, report_dates = [np.array([], dtype=int)], [np.array([], dtype=object)]
+
+    result = _take_rows(transactions, category_index, np.concatenate(selected)).reset_index(drop=True)
+    result.insert(0, "Дата отчёта", np.concatenate(report_dates))
+
+    return result
+
+
+@profiled
+def spending_by_category_rolling(
+    transactions: pd.DataFrame | Dataset,
+    categories: list[str] | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> pd.DataFrame:
+    """
+    Функция возвращает для каждого дня сумму платежей по категориям за последние три месяца от этого дня,
+    то есть сумму "Сумма платежа" строк, которые вернул бы spending_by_category для этой даты.
+    Считается по накопленным суммам по дням, без фильтрации DataFrame для каждого дня.
+    Результат можно сохранить в файл декоратором ReportSaver
+
+    :param transactions: Принимает на вход DataFrame или Dataset из load_dataset
+    :param categories: Опционально. Категории. Если не определены - все категории
+    :param start_date: Опционально. Первый день в формате День.Месяц.Год. Если не определён - день первой операции
+    :param end_date: Опционально. Последний день в формате День.Месяц.Год. Если не определён - день последней операции
+    :return: DataFrame: столбец "Дата" и столбец с суммой по каждой категории
+    """
+
+    category_index = get_category_index(transactions)
+    op_days = category_index["dates"].astype("datetime64[D]")
+    op_days = op_days[~np.isnat(op_days)]
+
+    if start_date:
+        first_day = np.datetime64(datetime.datetime.strptime(start_date, "%d.%m.%Y").date())
+    else:
+        first_day = op_days.min() if len(op_days) else np.datetime64("today")
+    if end_date:
+        last_day = np.datetime64(datetime.datetime.strptime(end_date, "%d.%m.%Y").date())
+    else:
+        last_day = op_days.max() if len(op_days) else np.datetime64("today")
+
+    window = np.timedelta64(90, "D")
+    days = np.arange(first_day, last_day + 1, dtype="datetime64[D]")
+    # Счёт дней начинается за 90 дней до первого дня, чтобы окно первого дня было полным
+    base_day = first_day - window
+    n_days = len(days) + 90
+    anchors = np.arange(90, n_days)
+
+    frame = transactions.frame if isinstance(transactions, Dataset) else transactions
+    kopecks = np.rint(frame["Сумма платежа"].fillna(0).to_numpy(float) * 100).astype(np.int64)
+    result = {"Дата": days}
+
+    if categories is None:
+        categories = list(category_index["categories"])
+
+    for category in categories:
+        # Отсутствующая категория даёт нулевые суммы
+        positions, op_dates = category_index["categories"].get(
+            category, (np.array([], dtype=int), np.array([], dtype="datetime64[ns]"))
+        )
+        day_idx = (op_dates.astype("datetime64[D]") - base_day).astype(np.int64)
+        inside = (day_idx >= 0) & (day_idx < n_days) & ~np.isnat(op_dates)
+
+        # Суммы по дням и суммы операций ровно в полночь: правая граница окна - начало дня, она входит в окно
+        daily = np.bincount(day_idx[inside], weights=kopecks[positions[inside]], minlength=n_days)
+        at_midnight = inside & (op_dates == op_dates.astype("datetime64[D]"))
+        midnight = np.bincount(day_idx[at_midnight], weights=kopecks[positions[at_midnight]], minlength=n_days)
+
+        cumulative = np.concatenate(([0], np.cumsum(daily.astype(np.int64))))
+        totals = cumulative[anchors] - cumulative[anchors - 90] + midnight[anchors].astype(np.int64)
+        result[category] = totals / 100
+
+    return pd.DataFrame(result)
+
+
+def _get_date_window(date: str | None) -> tuple[np.datetime64, np.datetime64]:
+    """
+    Функция определяет границы окна в три месяца до переданной даты
+    :param date: Дата в формате День.Месяц.Год. Если не определена - текущая дата
+    :return: (начало левого дня, начало правого дня). Обе границы входят в окно
+    """
+
     # Определняем дату в случае если её не передали. Берем текущую дату(сегодняшнюю)
     if not date:
         date = str(datetime.datetime.now()).rsplit(".", 1)[0]  # Отсекаем миллисекунды
@@ -24,12 +176,74 @@ def spending_by_category(transactions: pd.DataFrame, category: str, date: str |
     # Определяем "левый край" даты, который соответсвует трём месяцем
     left_date = right_date - datetime.timedelta(hours=24 * 90)
 
-    df = transactions
-    # Определяем столбец с датами
-    df["Дата операции"] = pd.to_datetime(df["Дата операции"], format="%d.%m.%Y %H:%M:%S")
+    return np.datetime64(left_date.strftime("%Y-%m-%d")), np.datetime64(right_date.strftime("%Y-%m-%d"))
+
+
+@profiled
+def get_category_index(transactions: pd.DataFrame | Dataset) -> dict:
+    """
+    Функция возвращает индекс операций: разобранные даты операций и номера строк каждой категории,
+    отсортированные по дате. Для Dataset индекс строится один раз на версию файла.
+    Для DataFrame индекс ищется по отпечатку содержимого столбцов даты и категории,
+    поэтому изменённый DataFrame получает новый индекс
+    :param transactions: DataFrame с операциями или Dataset из load_dataset
+    :return: Словарь: dates - даты всех строк, categories - {Категория: (номера строк, даты)}
+    """
+
+    if isinstance(transactions, Dataset):
+        category_index: dict = transactions.derived(
+            "reports.category_index",
+            lambda ds: _build_category_index(ds.frame["Категория"], ds.dates("Дата операции")),
+        )
+        return category_index
+
+    digest = hashlib.sha256(str(len(transactions)).encode())
+    digest.update(pd.util.hash_pandas_object(transactions[INDEX_COLUMNS], index=False).to_numpy().tobytes())
+    key = digest.hexdigest()
+
+    with _category_indexes_lock:
+        if key in _category_indexes:
+            _category_indexes.move_to_end(key)
+            return _category_indexes[key]
+
+    date_column = transactions["Дата операции"]
+    if not pd.api.types.is_datetime64_any_dtype(date_column):
+        # Разбираем даты в отдельный массив, не записывая их в переданный DataFrame
+        date_column = pd.to_datetime(date_column, format="%d.%m.%Y %H:%M:%S")
+    category_index = _build_category_index(transactions["Категория"], date_column.to_numpy("datetime64[ns]"))
+
+    with _category_indexes_lock:
+        _category_indexes[key] = category_index
+        while len(_category_indexes) > CATEGORY_INDEX_ENTRIES:
+            _category_indexes.popitem(last=False)
+
+    return category_index
+
+
+def _build_category_index(categories: pd.Series, op_dates: np.ndarray) -> dict:
+    """
+    Функция делит номера строк по категориям и сортирует их по дате операции
+    :param categories: Столбец "Категория"
+    :param op_dates: Даты операций в порядке строк
+    :return: Словарь: dates - даты всех строк, categories - {Категория: (номера строк, даты)}
+    """
+
+    positions_by_category = {}
+    for category, unordered in categories.groupby(categories, sort=False).indices.items():
+        positions = unordered[np.argsort(op_dates[unordered], kind="stable")]
+        positions_by_category[category] = (positions, op_dates[positions])
+
+    return {"dates": op_dates, "categories": positions_by_category}
+
+
+def _take_rows(transactions: pd.DataFrame | Dataset, category_index: dict, positions: np.ndarray) -> pd.DataFrame:
+    """
+    Функция возвращает новый DataFrame из строк с переданными номерами.
+    Столбец "Дата операции" в результате - разобранные даты
+    """
 
-    # Фильтруем сначала операции подходящие по дате. Далее по категории (разделен на 2 т.к. длинное выражение)
-    filtered_df = df.loc[df["Дата операции"].between(left_date.strftime("%Y-%m-%d"), right_date.strftime("%Y-%m-%d"))]
-    filtered_df = filtered_df.loc[df["Категория"] == category]
+    frame = transactions.frame if isinstance(transactions, Dataset) else transactions
+    result = frame.iloc[positions].copy()
+    result["Дата операции"] = category_index["dates"][positions]
 
-    return filtered_df
+    return result
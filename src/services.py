@@ -1,12 +1,27 @@
-import re
+import datetime
+from collections import defaultdict
+from typing import Any
+
+import numpy as np
+import pandas as pd
 
 from config import OP_DATA_DIR
+from src.dataset import Dataset, load_dataset
+from src.decorators import cached, profiled
 from src.my_logger import Logger
-from src.utils import read_file_data
+from src.utils import AhoCorasick
+
+logger = Logger("services", queued=True).on_duty()
+
+# Столбцы, по которым работает простой поиск
+SEARCH_COLUMNS = ("Категория", "Описание")
 
-logger = Logger("services").on_duty()
+# Имя и первая буква фамилии в описании перевода физическому лицу
+PERSON_PATTERN = r"\w* [\w]{1}\."
 
 
+@profiled
+@cached(path_arg="file_path")
 def simple_searching(search_field: str, file_path: str = OP_DATA_DIR) -> list[dict]:
     """
     Функция для поиска операций по полю поиска в описании операции или в категории.
@@ -16,40 +31,282 @@ def simple_searching(search_field: str, file_path: str = OP_DATA_DIR) -> list[di
     """
 
     search_field = search_field.lower()
-    all_op_data = read_file_data(file_path)
+    dataset = load_dataset(file_path)
 
-    tmp = []
-    for op in all_op_data:
-        op_category = op["Категория"] or " "
-        op_descr = op["Описание"] or " "
+    # Подходящие строки ищутся среди уникальных значений столбцов, затем через коды переводятся в номера строк
+    matched_rows = np.zeros(len(dataset.frame), dtype=bool)
+    for column in SEARCH_COLUMNS:
+        search_index = dataset.derived(f"services.search_index:{column}", lambda ds: _build_search_index(ds, column))
+        matched_values = _search_values(search_index, search_field)
+        matched_rows |= matched_values[search_index["codes"]]
 
-        if search_field in op_category.lower() or search_field in op_descr.lower():
-            tmp.append(op)
+    all_op_data = dataset.records
+    tmp = [dict(all_op_data[pos]) for pos in np.flatnonzero(matched_rows)]
 
-    logger.debug(f"В поиск передано: {search_field}. Найдено совпадений: {len(tmp)}")
+    logger.debug("В поиск передано: %s. Найдено совпадений: %s", search_field, len(tmp))
 
     return tmp
 
 
-def search_by_persons(filepath: str = OP_DATA_DIR) -> list[dict]:
+@profiled
+def batch_searching(search_fields: list[str], file_path: str = OP_DATA_DIR) -> dict[str, list[dict]]:
+    """
+    Функция для поиска операций сразу по нескольким строкам поиска в описании операции или в категории.
+    Все строки ищутся за один проход по уникальным значениям столбцов автоматом Ахо-Корасик.
+    :param search_fields: Строки для поиска.
+    :param file_path: Путь до файла
+    :return: Словарь {Строка поиска: список подходящих операций}. Совпадения такие же, как у simple_searching
+    """
+
+    dataset = load_dataset(file_path)
+    patterns = list(dict.fromkeys(field.lower() for field in search_fields))
+    automaton = AhoCorasick([pattern for pattern in patterns if pattern])
+
+    # Пустая строка поиска содержится в любом значении
+    matched_rows = {pattern: np.full(len(dataset.frame), pattern == "") for pattern in patterns}
+    non_empty = [pattern for pattern in patterns if pattern]
+
+    for column in SEARCH_COLUMNS:
+        search_index = dataset.derived(f"services.search_index:{column}", lambda ds: _build_search_index(ds, column))
+        matched_values = np.zeros((len(non_empty), len(search_index["values"])), dtype=bool)
+
+        for value_id, value in enumerate(search_index["values"]):
+            for pattern_id in automaton.find(value):
+                matched_values[pattern_id, value_id] = True
+
+        for pattern_id, pattern in enumerate(non_empty):
+            matched_rows[pattern] |= matched_values[pattern_id][search_index["codes"]]
+
+    all_op_data = dataset.records
+    result = {
+        field: [dict(all_op_data[pos]) for pos in np.flatnonzero(matched_rows[field.lower()])]
+        for field in search_fields
+    }
+
+    logger.debug("В пакетный поиск передано строк: %s", len(search_fields))
+
+    return result
+
+
+def _get_trigrams(text: str) -> set[str]:
+    """
+    Функция возвращает множество триграмм (подстрок из трёх символов) строки
+    :param text: Строка
+    :return: Множество триграмм
+    """
+    return {text[start:end] for start, end in enumerate(range(3, len(text) + 1))}
+
+
+def _build_search_index(dataset: Dataset, column: str) -> dict:
+    """
+    Функция кодирует столбец словарём уникальных значений в нижнем регистре и строит по ним
+    инвертированный индекс триграмм. Пустые поля заменяются пробелом, как и при поиске перебором
+    :param dataset: Загруженные данные
+    :param column: Столбец для поиска
+    :return: Словарь: values - уникальные значения, codes - номер значения для каждой строки,
+        postings - {триграмма: номера уникальных значений}
+    """
+
+    texts = [(op[column] or " ").lower() for op in dataset.records]
+    codes, values = pd.factorize(pd.Series(texts, dtype=object))
+
+    postings: defaultdict[str, list[int]] = defaultdict(list)
+    for value_id, value in enumerate(values):
+        for trigram in _get_trigrams(value):
+            postings[trigram].append(value_id)
+
+    return {
+        "values": list(values),
+        "codes": codes,
+        "postings": {trigram: np.array(value_ids) for trigram, value_ids in postings.items()},
+    }
+
+
+def _search_values(search_index: dict, search_field: str) -> np.ndarray:
+    """
+    Функция ищет строку среди уникальных значений столбца
+    :param search_index: Индекс столбца из _build_search_index
+    :param search_field: Строка для поиска в нижнем регистре
+    :return: Маска подходящих уникальных значений
+    """
+
+    # Кандидаты - значения, в которых есть все триграммы строки поиска. Короткие строки проверяются перебором
+    if len(search_field) < 3:
+        candidates = np.arange(len(search_index["values"]))
+    else:
+        candidates = _intersect_postings(search_index["postings"], _get_trigrams(search_field))
+
+    matched = np.zeros(len(search_index["values"]), dtype=bool)
+    for value_id in candidates:
+        matched[value_id] = search_field in search_index["values"][value_id]
+
+    return matched
+
+
+def _intersect_postings(postings: dict[str, np.ndarray], trigrams: set[str]) -> np.ndarray:
+    """
+    Функция пересекает списки строк по всем триграммам, начиная с самого короткого списка
+    :param postings: Инвертированный индекс {триграмма: номера строк}
+    :param trigrams: Триграммы строки поиска
+    :return: Отсортированные номера строк, содержащих все триграммы
+    """
+
+    if any(trigram not in postings for trigram in trigrams):
+        return np.array([], dtype=int)
+
+    lists = sorted((postings[trigram] for trigram in trigrams), key=len)
+    result = lists[0]
+    for rows in lists[1:]:
+        result = np.intersect1d(result, rows, assume_unique=True)
+
+    return result
+
+
+@profiled
+@cached(path_arg="filepath")
+def search_by_persons(filepath: str = OP_DATA_DIR, with_recipient: bool = False) -> list[dict]:
     """
     Функция возвращает список операций физическим лицам
     :param filepath: путь до excel файла
+    :param with_recipient: Добавить в операции поле "Получатель" (имя и первая буква фамилии)
     :return:
     """
 
+    dataset = load_dataset(filepath)
+    person_transfers = dataset.derived("services.person_transfers", _build_person_transfers)
+    op_data = dataset.records
+
     tmp = []
-    op_data = read_file_data(filepath)
+    for pos in np.flatnonzero(person_transfers["is_person_transfer"]):
+        op = dict(op_data[pos])
+        if with_recipient:
+            op["Получатель"] = person_transfers["recipient"][pos]
+        tmp.append(op)
 
-    for op in op_data:
-        if op["Категория"] != "Переводы":
-            continue
+    logger.debug("Найдено совпадений: %s", len(tmp))
 
-        regex_pattern = r"\w* [\w]{1}\."
-        result = re.findall(regex_pattern, op["Описание"])
-        if result:
-            tmp.append(op)
+    return tmp
 
-    logger.debug(f"Найдено совпадений: {len(tmp)}")
 
-    return tmp
+def _build_person_transfers(dataset: Dataset) -> dict[str, np.ndarray]:
+    """
+    Функция размечает переводы физическим лицам: в описании перевода есть имя и первая буква фамилии.
+    Регулярное выражение применяется один раз ко всем строкам категории "Переводы"
+    :param dataset: Загруженные данные
+    :return: Словарь: is_person_transfer - маска переводов физ. лицам, recipient - получатель или None
+    """
+
+    frame = dataset.frame
+    transfers = (frame["Категория"] == "Переводы").to_numpy()
+    descriptions = frame.loc[transfers, "Описание"]
+
+    is_person_transfer = np.zeros(len(frame), dtype=bool)
+    is_person_transfer[transfers] = descriptions.str.contains(PERSON_PATTERN, regex=True, na=False).to_numpy(bool)
+
+    recipient = np.full(len(frame), None, dtype=object)
+    recipient[is_person_transfer] = (
+        frame.loc[is_person_transfer, "Описание"].str.extract(f"({PERSON_PATTERN})", expand=False).str.strip()
+    ).to_numpy(object)
+
+    return {"is_person_transfer": is_person_transfer, "recipient": recipient}
+
+
+@profiled
+def get_person_transfers(person: str, filepath: str = OP_DATA_DIR) -> list[dict]:
+    """
+    Функция возвращает переводы физическому лицу
+    :param person: Получатель в виде "Имя Ф."
+    :param filepath: путь до excel файла
+    :return: Список операций в порядке файла
+    """
+
+    dataset = load_dataset(filepath)
+    recipient = dataset.derived("services.recipient_index", _build_recipient_index)["recipients"].get(person)
+
+    if recipient is None:
+        return []
+
+    op_data = dataset.records
+    return [dict(op_data[pos]) for pos in np.sort(recipient["positions"])]
+
+
+@profiled
+def get_person_transfers_sum(
+    person: str, start_date: str | None = None, end_date: str | None = None, filepath: str = OP_DATA_DIR
+) -> float:
+    """
+    Функция возвращает сумму совершённых переводов физическому лицу за период
+    :param person: Получатель в виде "Имя Ф."
+    :param start_date: Опционально. Первый день периода в формате День.Месяц.Год. Если не определён - с начала
+    :param end_date: Опционально. Последний день периода в формате День.Месяц.Год. Если не определён - до конца
+    :param filepath: путь до excel файла
+    :return: Сумма переводов в рублях
+    """
+
+    dataset = load_dataset(filepath)
+    recipient = dataset.derived("services.recipient_index", _build_recipient_index)["recipients"].get(person)
+
+    if recipient is None:
+        return 0.0
+
+    # Бинарным поиском находим границы периода в отсортированных датах переводов получателю
+    left, right = 0, len(recipient["dates"])
+    if start_date:
+        start = np.datetime64(datetime.datetime.strptime(start_date, "%d.%m.%Y"))
+        left = int(np.searchsorted(recipient["dates"], start, side="left"))
+    if end_date:
+        end = np.datetime64(datetime.datetime.strptime(end_date, "%d.%m.%Y") + datetime.timedelta(days=1))
+        right = int(np.searchsorted(recipient["dates"], end, side="left"))
+
+    return int(recipient["cumulative"][max(left, right)] - recipient["cumulative"][left]) / 100
+
+
+@profiled
+def get_top_recipients(top_n: int = 10, filepath: str = OP_DATA_DIR) -> list[dict]:
+    """
+    Функция возвращает получателей с наибольшей суммой совершённых переводов
+    :param top_n: Количество получателей
+    :param filepath: путь до excel файла
+    :return: Список словарей {"recipient": получатель, "amount": сумма в рублях, "count": количество переводов}
+    """
+
+    dataset = load_dataset(filepath)
+    return [dict(item) for item in dataset.derived("services.recipient_index", _build_recipient_index)["top"][:top_n]]
+
+
+def _build_recipient_index(dataset: Dataset) -> dict:
+    """
+    Функция строит индекс переводов физическим лицам по получателю.
+    Для каждого получателя хранятся номера строк и даты, отсортированные по дате,
+    и накопленная сумма совершённых (Статус == OK) переводов в копейках
+    :param dataset: Загруженные данные
+    :return: Словарь: recipients - {получатель: данные}, top - получатели по убыванию суммы переводов
+    """
+
+    person_transfers = dataset.derived("services.person_transfers", _build_person_transfers)
+    positions = np.flatnonzero(person_transfers["is_person_transfer"])
+
+    op_dates = dataset.dates("Дата операции").astype("datetime64[us]")[positions]
+    amounts = dataset.frame["Сумма платежа"].to_numpy()[positions]
+    ok = (dataset.frame["Статус"] == "OK").to_numpy()[positions]
+    # Учитываем только списания: перевод получателю уменьшает сумму на счёте
+    sent = np.where(ok & (amounts < 0), np.rint(-amounts * 100), 0).astype(np.int64)
+
+    recipient_names = pd.Series(person_transfers["recipient"][positions])
+    recipients = {}
+
+    for person, unordered in recipient_names.groupby(recipient_names, sort=False).indices.items():
+        group = unordered[np.argsort(op_dates[unordered], kind="stable")]
+        recipients[person] = {
+            "positions": positions[group],
+            "dates": op_dates[group],
+            "cumulative": np.concatenate(([0], np.cumsum(sent[group]))),
+        }
+
+    top: list[dict[str, Any]] = [
+        {"recipient": person, "amount": int(data["cumulative"][-1]) / 100, "count": len(data["positions"])}
+        for person, data in recipients.items()
+    ]
+    top.sort(key=lambda item: item["amount"], reverse=True)
+
+    return {"recipients": recipients, "top": top}
@@ -1,6 +1,10 @@
+from collections import deque
+
 import numpy as np
 import pandas as pd
 
+from src.dataset import load_dataset
+
 
 def read_file_data(file_path: str) -> list[dict]:
     """
@@ -9,8 +13,8 @@ def read_file_data(file_path: str) -> list[dict]:
     :return: Данные в виде списка словарей
     """
 
-    data = pd.read_excel(file_path).replace({np.nan: None})
-    data_as_dict = data.to_dict("records")
+    # Данные берутся из общего кэша. Словари копируются, чтобы изменения не попадали в кэш
+    data_as_dict = [dict(op) for op in load_dataset(file_path).records]
 
     return data_as_dict
 
@@ -22,3 +26,56 @@ def get_json_from_dataframe(df: pd.DataFrame) -> list[dict]:
     :return:
     """
     return df.replace({np.nan: None}).to_dict("records")
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо-Корасик для поиска сразу нескольких подстрок за один проход по тексту
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[set[int]] = [set()]
+
+        # Строим бор из всех подстрок
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].add(pattern_id)
+
+        # Обходом в ширину проставляем суффиксные ссылки
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def find(self, text: str) -> set[int]:
+        """
+        Возвращает номера подстрок, которые встречаются в тексте
+        :param text: Текст для поиска
+        :return: Множество номеров подстрок в порядке их передачи в конструктор
+        """
+
+        found: set[int] = set()
+        node = 0
+
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found |= self.output[node]
+
+        return found
@@ -1,23 +1,57 @@
 import datetime
 import json
 import os
+import threading
+import time
 from collections import defaultdict
-from typing import Literal
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Literal
+from urllib.parse import urlparse
 
 import dotenv
+import numpy as np
 import pandas as pd
 import requests
 
 from config import OP_DATA_DIR, USER_SETTINGS
+from src.dataset import Dataset, load_dataset
+from src.decorators import cached, profiled, profiler
 from src.my_logger import Logger
-from src.utils import get_json_from_dataframe
+from src.quote_cache import QuoteCache
 
 dotenv.load_dotenv()
 
-logger = Logger("view").on_duty()
+logger = Logger("view", queued=True).on_duty()
 
+# Максимальное количество одновременных запросов котировок
+QUOTES_MAX_WORKERS = 8
 
-def post_events_response(date: str, optional_flag: Literal["M", "W", "Y", "ALL"] = "M") -> dict:
+# Таймаут в секундах одного HTTP запроса котировки
+QUOTES_REQUEST_TIMEOUT = 5.0
+
+# Время в секундах, за которое post_events_response должен вернуть ответ
+EVENTS_DEADLINE = 10.0
+
+# Отметка котировки, которую не удалось получить до истечения времени ожидания
+QUOTE_UNAVAILABLE = "unavailable"
+
+# Сессии с keep-alive соединениями, по одной на хост API
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# Время в секундах, в течение которого котировка считается свежей, по источникам
+QUOTES_TTL = {"currency": 60.0, "stock": 15.0}
+
+# Время в секундах, после которого устаревшая котировка не возвращается. None - без ограничения
+QUOTES_MAX_STALENESS: dict[str, float | None] = {"currency": 3600.0, "stock": 300.0}
+
+quote_cache = QuoteCache()
+
+
+@profiled
+def post_events_response(
+    date: str, optional_flag: Literal["M", "W", "Y", "ALL"] = "M", deadline: float = EVENTS_DEADLINE
+) -> dict:
     """
     Главная функция.
     Собирает данные(траты, поступления, стоимости валют и акций) из других функций
@@ -25,13 +59,21 @@ def post_events_response(date: str, optional_flag: Literal["M", "W", "Y", "ALL"]
 
     :param date: Формат даты День.Месяц.Год
     :param optional_flag: Отображение операций за месяц/неделю/год/всё время(до введенной даты)
+    :param deadline: Время в секундах на ответ. Котировки, не полученные за это время,
+        возвращаются со значением None и отметкой "status": "unavailable"
     :return: готовый JSON ответ (словарь)
     """
 
-    f_by_date_operations = get_operations_by_date_range(date, optional_flag)
-    expences, income = get_expences_income(f_by_date_operations)
+    # Котировки запрашиваются в фоне, пока считаются траты и поступления. Ответ занимает время самой долгой части
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="events") as executor:
+        quotes_future = executor.submit(get_currency_stocks, USER_SETTINGS, timeout=deadline)
+
+        expences, income = get_expences_income_by_date_range(date, optional_flag)
+
+        # Время, которое ответ ждёт котировки после подсчёта трат и поступлений
+        with profiler.stage("src.views.post_events_response.quotes_wait"):
+            currency_rates, stocks_prices = quotes_future.result()
 
-    currency_rates, stocks_prices = get_currency_stocks(USER_SETTINGS)
     result = {"expences": expences, "income": income, "currency_rates": currency_rates, "stock_prices": stocks_prices}
 
     logger.info("Возвращенные данные указаны ниже")
@@ -40,12 +82,14 @@ def post_events_response(date: str, optional_flag: Literal["M", "W", "Y", "ALL"]
     return result
 
 
-def get_operations_by_date_range(date: str, optional_flag: str = "M") -> list[dict]:
+@profiled
+def get_date_range(date: str, optional_flag: str = "M") -> tuple[datetime.datetime, datetime.datetime]:
     """
-    Функция для фильтрации данных об операциях по дате.
+    Функция определяет границы периода для фильтрации операций по дате.
+    Подходят операции строго между границами.
     :param date: Формат даты День.Месяц.Год
     :param optional_flag: Отображение операций за месяц/неделю/год/всё время(до введенной даты)
-    :return: Список словарей с данными об операциях
+    :return: (начало периода, конец периода)
     """
 
     # Задаём последнюю дату операций
@@ -67,24 +111,91 @@ def get_operations_by_date_range(date: str, optional_flag: str = "M") -> list[di
         # Берем все операции с начала до указанной даты
         start_date = last_date.replace(day=1, month=1, year=1)
 
-    df = get_dataframe_from_file(OP_DATA_DIR)  # Считываем DataFrame из файла
-    op_data = get_json_from_dataframe(df)  # Считываем данные из DataFrame
-    tmp = []  # Контейнер для операций попадающих под требование
+    return start_date, last_date.replace(day=last_date.day + 1)
+
+
+@profiled
+@cached(path=OP_DATA_DIR)
+def get_operations_by_date_range(date: str, optional_flag: str = "M") -> list[dict]:
+    """
+    Функция для фильтрации данных об операциях по дате.
+    :param date: Формат даты День.Месяц.Год
+    :param optional_flag: Отображение операций за месяц/неделю/год/всё время(до введенной даты)
+    :return: Список словарей с данными об операциях
+    """
+
+    start_date, end_date = get_date_range(date, optional_flag)
+
+    dataset = load_dataset(OP_DATA_DIR)
+    date_index = dataset.derived("views.date_index", _build_date_index)
+
+    # Бинарным поиском находим операции строго между началом и концом периода
+    left = np.searchsorted(date_index["dates"], np.datetime64(start_date), side="right")
+    right = np.searchsorted(date_index["dates"], np.datetime64(end_date), side="left")
+    positions = date_index["order"][left:right]
 
-    # Отсекаем операции которые не были совершены и деньги не покинули счёт
-    for op in op_data:
-        if op["Статус"] != "OK":
-            continue
+    # Отсекаем операции которые не были совершены и деньги не покинули счёт. Возвращаем порядок строк файла
+    positions = np.sort(positions[date_index["ok"][positions]])
 
-        op_date = datetime.datetime.strptime(op["Дата операции"], "%d.%m.%Y %H:%M:%S")
+    op_data = dataset.records
+    return [dict(op_data[pos]) for pos in positions]
 
-        # Если дата операции подходит под требование - добавляем в контейнер
-        if start_date < op_date < last_date.replace(day=last_date.day + 1):
-            tmp.append(op)
 
-    return tmp
+def _build_date_index(dataset: Dataset) -> dict[str, np.ndarray]:
+    """
+    Функция строит индекс операций по дате: отсортированные даты, номера строк в порядке дат
+    и маску совершенных операций (Статус == OK)
+    :param dataset: Загруженные данные
+    :return: Словарь с массивами dates, order, ok
+    """
+
+    # Микросекунды вместо наносекунд: в них без переполнения помещается начало периода "ALL" (1 год н.э.)
+    op_dates = dataset.dates("Дата операции").astype("datetime64[us]")
+    order = np.argsort(op_dates, kind="stable")
+
+    return {"dates": op_dates[order], "order": order, "ok": (dataset.frame["Статус"] == "OK").to_numpy()}
 
 
+def _build_amount_cube(dataset: Dataset) -> dict:
+    """
+    Функция строит накопленные по дням суммы трат и поступлений по каждой категории (день × категория).
+    Суммы хранятся в копейках, чтобы вычитание накопленных сумм было точным.
+    Сумма за период [день a, день b) по категории: cube[b] - cube[a]
+    :param dataset: Загруженные данные
+    :return: Словарь с накопленными суммами, количеством операций и данными для поправок
+    """
+
+    frame = dataset.frame
+    codes, categories = pd.factorize(frame["Категория"], use_na_sentinel=False)
+    amounts = frame["Сумма платежа"].to_numpy()
+    op_days = dataset.dates("Дата операции").astype("datetime64[D]")
+
+    # Учитываем только совершенные операции
+    ok = (frame["Статус"] == "OK").to_numpy() & ~np.isnat(op_days)
+    first_day = op_days[ok].min() if ok.any() else np.datetime64("1970-01-01", "D")
+    day_idx = (op_days[ok] - first_day).astype(np.int64)
+    n_days = int(day_idx.max()) + 1 if ok.any() else 0
+
+    cube = {
+        "first_day": first_day,
+        "categories": [None if pd.isna(cat) else cat for cat in categories],
+        "codes": codes,
+        "kopecks": np.abs(np.rint(amounts * 100)).astype(np.int64),
+        "is_expence": amounts < 0,
+    }
+
+    for name, mask in (("expences", cube["is_expence"][ok]), ("income", ~cube["is_expence"][ok])):
+        sums = np.zeros((n_days + 1, len(categories)), dtype=np.int64)
+        counts = np.zeros((n_days + 1, len(categories)), dtype=np.int64)
+        np.add.at(sums, (day_idx[mask] + 1, codes[ok][mask]), cube["kopecks"][ok][mask])
+        np.add.at(counts, (day_idx[mask] + 1, codes[ok][mask]), 1)
+        cube[name] = np.cumsum(sums, axis=0)
+        cube[f"{name}_count"] = np.cumsum(counts, axis=0)
+
+    return cube
+
+
+@profiled
 def get_expences_categories(expences_categories: dict) -> dict:
     """
     Функция принимает на вход словарь с тратами по всем категориям, сортирует по убыванию,
@@ -123,9 +234,11 @@ def get_expences_categories(expences_categories: dict) -> dict:
             other_cat_value += popped_dict["amount"]
         expences_main.append({"category": "Остальное", "amount": other_cat_value})
 
-    return {"total_amount": total_amount, "main": expences_main, "transfers_and_cash": transfers_and_cash}
+    # Округляем до копеек, чтобы итог не зависел от порядка сложения
+    return {"total_amount": round(total_amount, 2), "main": expences_main, "transfers_and_cash": transfers_and_cash}
 
 
+@profiled
 def get_income_categories(income_categories: dict) -> dict:
     """
     Функция принимает на вход словарь с поступлениями по всем категориям, сортирует по убыванию.
@@ -146,9 +259,10 @@ def get_income_categories(income_categories: dict) -> dict:
 
     income_main.sort(key=lambda x: x["amount"], reverse=True)
 
-    return {"total_amount": total_amount, "main": income_main}
+    return {"total_amount": round(total_amount, 2), "main": income_main}
 
 
+@profiled
 def get_expences_income(operations: list[dict]) -> tuple[dict, dict]:
     """
     Функция принимает на вход список словарей с данными о всех отсортированных по дате операциях.
@@ -175,10 +289,68 @@ def get_expences_income(operations: list[dict]) -> tuple[dict, dict]:
     return expences, incomes
 
 
-def get_currency_stocks(file_path: str = USER_SETTINGS) -> tuple[list, list]:
+@profiled
+def get_expences_income_by_date_range(date: str, optional_flag: str = "M") -> tuple[dict, dict]:
+    """
+    Функция возвращает траты и поступления за период без перебора операций.
+    Результат совпадает с get_expences_income(get_operations_by_date_range(date, optional_flag)),
+    но считается по накопленным суммам, поэтому период "ALL" обходится так же дёшево, как "W".
+
+    :param date: Формат даты День.Месяц.Год
+    :param optional_flag: Отображение операций за месяц/неделю/год/всё время(до введенной даты)
+    :return: Словари (траты, поступления)
+    """
+
+    start_date, end_date = get_date_range(date, optional_flag)
+
+    with profiler.stage("src.views.get_expences_income_by_date_range.load"):
+        dataset = load_dataset(OP_DATA_DIR)
+        cube = dataset.derived("views.amount_cube", _build_amount_cube)
+        date_index = dataset.derived("views.date_index", _build_date_index)
+
+    with profiler.stage("src.views.get_expences_income_by_date_range.filter"):
+        # Номера дней периода в накопленных суммах. Конец периода - полночь, поэтому день конца не входит
+        n_days = len(cube["expences"]) - 1
+        left = int(np.clip((np.datetime64(start_date, "D") - cube["first_day"]).astype(np.int64), 0, n_days))
+        right = int(np.clip((np.datetime64(end_date, "D") - cube["first_day"]).astype(np.int64), 0, n_days))
+        right = max(left, right)
+
+        sums = {name: cube[name][right] - cube[name][left] for name in ("expences", "income")}
+        counts = {name: cube[f"{name}_count"][right] - cube[f"{name}_count"][left] for name in ("expences", "income")}
+
+        # Начало периода строгое: операции ровно в полночь первого дня не входят в период
+        lo = np.searchsorted(date_index["dates"], np.datetime64(start_date), side="left")
+        hi = np.searchsorted(date_index["dates"], np.datetime64(start_date), side="right")
+        for pos in date_index["order"][lo:hi]:
+            if date_index["ok"][pos]:
+                name = "expences" if cube["is_expence"][pos] else "income"
+                sums[name][cube["codes"][pos]] -= cube["kopecks"][pos]
+                counts[name][cube["codes"][pos]] -= 1
+
+    with profiler.stage("src.views.get_expences_income_by_date_range.aggregate"):
+        categories_sums = {
+            name: {cube["categories"][code]: int(sums[name][code]) / 100 for code in np.flatnonzero(counts[name])}
+            for name in ("expences", "income")
+        }
+
+        return get_expences_categories(categories_sums["expences"]), get_income_categories(categories_sums["income"])
+
+
+@profiled
+def get_currency_stocks(
+    file_path: str = USER_SETTINGS,
+    max_workers: int = QUOTES_MAX_WORKERS,
+    use_cache: bool = True,
+    timeout: float | None = None,
+) -> tuple[list, list]:
     """
     Функция для определения курса валюты и цены акций, указанных в file_path настройках.
+    Запросы выполняются одновременно, время ответа определяется самым медленным запросом.
     :param file_path: Путь до файла с настройками пользователя
+    :param max_workers: Максимальное количество одновременных запросов. 1 - запросы по очереди
+    :param use_cache: Брать котировки из кэша quote_cache
+    :param timeout: Время в секундах на все запросы. Котировки, не полученные за это время,
+        возвращаются со значением None и отметкой "status": "unavailable". None - без ограничения
     :return: Списки. (курсы валюты, акции)
     """
 
@@ -187,27 +359,200 @@ def get_currency_stocks(file_path: str = USER_SETTINGS) -> tuple[list, list]:
         user_currencies = user_settings["user_currencies"]
         user_stocks = user_settings["user_stocks"]
 
-    currency_list = []
-    stocks_list = []
+    workers = max(1, min(max_workers, len(user_currencies) + len(user_stocks)))
+
+    request_timeout = QUOTES_REQUEST_TIMEOUT if timeout is None else min(timeout, QUOTES_REQUEST_TIMEOUT)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quotes")
+    try:
+        # Все валюты запрашиваются одним запросом, акции - по одной
+        rates_future = executor.submit(get_cached_currency_rates, user_currencies, use_cache, request_timeout)
+        stock_futures = [
+            executor.submit(get_cached_stock_price, stock, use_cache, request_timeout) for stock in user_stocks
+        ]
+        futures: list[Future] = [rates_future, *stock_futures]
+        wait(futures, timeout=timeout)
+    finally:
+        # Не ждём зависшие запросы: они завершатся сами по таймауту запроса
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Запросы, которые не успели начаться до истечения времени, отменены
+    rates_received, rates = _get_finished_result(rates_future)
+    rates = rates if rates_received and rates else {}
+    stock_results = [_get_finished_result(fut) for fut in stock_futures]
+    currency_list = [
+        (
+            {"currency": cur, "rate": rates[cur]}
+            if cur in rates
+            else {"currency": cur, "rate": None, "status": QUOTE_UNAVAILABLE}
+        )
+        for cur in user_currencies
+    ]
+    stocks_list = [
+        (
+            {"stock": stock, "price": price}
+            if received
+            else {"stock": stock, "price": None, "status": QUOTE_UNAVAILABLE}
+        )
+        for stock, (received, price) in zip(user_stocks, stock_results)
+    ]
+
+    if len(rates) < len(user_currencies) or not all(received for received, _ in stock_results):
+        logger.warning("Не все котировки получены за %s с", timeout)
 
-    for cur in user_currencies:
-        cur_price = get_currency_price(cur)
-        currency_list.append({"currency": cur, "rate": cur_price})
+    return currency_list, stocks_list
 
-    for stock in user_stocks:
-        stock_price = get_stock_price(stock)
-        stocks_list.append({"stock": stock, "price": stock_price})
 
-    return currency_list, stocks_list
+def _get_finished_result(future: Future) -> tuple[bool, Any]:
+    """
+    Функция возвращает результат завершённого запроса
+    :return: (True, результат) или (False, None), если запрос не завершён, отменён или завершился ошибкой
+    """
+
+    if not future.done() or future.cancelled():
+        return False, None
 
+    error = future.exception()
+    if error is not None:
+        logger.warning("Запрос котировки завершился ошибкой: %r", error)
+        return False, None
 
-def get_currency_price(currency: str, into: str = "RUB") -> None | float:
+    return True, future.result()
+
+
+@profiled
+def get_cached_currency_rates(
+    currencies: list[str], use_cache: bool = True, timeout: float | None = QUOTES_REQUEST_TIMEOUT
+) -> dict[str, None | float]:
+    """
+    Функция возвращает курсы валют в рублях через кэш quote_cache.
+    Отсутствующие в кэше и устаревшие курсы запрашиваются одним запросом
+    :param currencies: Коды валют
+    :param use_cache: Если False - курсы запрашиваются без кэша
+    :param timeout: Таймаут запросов в секундах
+    :return: Словарь {Валюта: курс или None}
+    """
+
+    if not use_cache:
+        return get_currency_rates(currencies, timeout=timeout)
+
+    def fetch_many(keys: list) -> dict:
+        rates = get_currency_rates([cur for _, cur, _ in keys], timeout=timeout)
+        return {("currency", cur, "RUB"): rate for cur, rate in rates.items()}
+
+    cached = quote_cache.get_many(
+        [("currency", cur, "RUB") for cur in currencies],
+        fetch_many,
+        QUOTES_TTL["currency"],
+        QUOTES_MAX_STALENESS["currency"],
+    )
+
+    return {cur: cached[("currency", cur, "RUB")] for cur in currencies}
+
+
+@profiled
+def get_cached_stock_price(
+    stock: str, use_cache: bool = True, timeout: float | None = QUOTES_REQUEST_TIMEOUT
+) -> None | float:
+    """
+    Функция возвращает цену акции в долларах через кэш quote_cache
+    :param stock: Код акции
+    :param use_cache: Если False - цена запрашивается без кэша
+    :param timeout: Таймаут запроса в секундах
+    :return: Если ответа нет - None, в успешном случае float
+    """
+
+    if not use_cache:
+        return get_stock_price(stock, timeout)
+
+    return quote_cache.get(
+        ("stock", stock, "USD"),
+        lambda: get_stock_price(stock, timeout),
+        QUOTES_TTL["stock"],
+        QUOTES_MAX_STALENESS["stock"],
+    )
+
+
+@profiled
+def get_session(url: str) -> requests.Session:
+    """
+    Функция возвращает общую сессию для хоста из url. Соединения с хостом переиспользуются между запросами
+    :param url: Адрес запроса
+    :return: Сессия requests
+    """
+
+    host = urlparse(url).netloc
+
+    with _sessions_lock:
+        if host not in _sessions:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=QUOTES_MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+
+        return _sessions[host]
+
+
+@profiled
+def get_currency_rates(
+    currencies: list[str], into: str = "RUB", timeout: float | None = QUOTES_REQUEST_TIMEOUT
+) -> dict[str, None | float]:
+    """
+    Функция получает курсы нескольких валют одним запросом /latest от базовой валюты into
+    и пересчитывает их в стоимость одной единицы валюты в into.
+    Если пакетный запрос не удался - недостающие валюты запрашиваются по одной через get_currency_price
+    API-сервис "Exchange Rates Data API" https://apilayer.com/marketplace/exchangerates_data-api
+
+    :param currencies: Коды валют
+    :param into: В какую валюту необходимо конвертировать
+    :param timeout: Таймаут в секундах на пакетный запрос вместе с запросами по одной валюте
+    :return: Словарь {Валюта: курс или None}
+    """
+
+    rates: dict[str, None | float] = {}
+    started = time.monotonic()
+
+    if currencies:
+        url = "https://api.apilayer.com/exchangerates_data/latest?"
+        params = {"base": into, "symbols": ",".join(currencies)}
+
+        data = _get_quote_json(url, params, {"apikey": os.getenv("CUR_API")}, timeout)
+        if data is not None:
+            batch_rates = data.get("rates") or {}
+
+            for cur in currencies:
+                # В ответе - сколько единиц валюты стоит одна единица into. Переворачиваем курс
+                rate = batch_rates.get(cur)
+                if isinstance(rate, (int, float)) and rate > 0:
+                    rates[cur] = 1 / rate
+
+    missing = [cur for cur in currencies if cur not in rates]
+    remaining = None if timeout is None else timeout - (time.monotonic() - started)
+
+    if missing and remaining is not None and remaining <= 0:
+        # Пакетный запрос израсходовал всё время: недостающие валюты остаются без курса
+        logger.warning("Пакетный запрос курсов не вернул %s, время на запросы истекло", missing)
+    elif missing:
+        logger.warning("Пакетный запрос курсов не вернул %s. Запрашиваем по одной валюте", missing)
+
+        with ThreadPoolExecutor(max_workers=min(len(missing), QUOTES_MAX_WORKERS)) as executor:
+            rates.update(zip(missing, executor.map(lambda cur: get_currency_price(cur, into, remaining), missing)))
+
+    return rates
+
+
+@profiled
+def get_currency_price(
+    currency: str, into: str = "RUB", timeout: float | None = QUOTES_REQUEST_TIMEOUT
+) -> None | float:
     """
     Функция для обращения по API запросу для получения цены валюты в рублёвом еквиваленте
     API-сервис "Exchange Rates Data API" https://apilayer.com/marketplace/exchangerates_data-api
 
     :param currency: Основная валюта
     :param into: В какую валюту необходимо конвертировать
+    :param timeout: Таймаут запроса в секундах
     :return: Если ответа нет - None, в успешном случае float
     """
 
@@ -216,40 +561,88 @@ def get_currency_price(currency: str, into: str = "RUB") -> None | float:
 
     params: dict[str, str | int] = {"to": into, "from": currency, "amount": 1}
 
-    response = requests.get(url, params=params, headers={"apikey": api_key})
-    if response.status_code != 200:
+    data = _get_quote_json(url, params, {"apikey": api_key}, timeout)
+    if data is None:
         return None
 
-    result: float | None = response.json().get("result")
+    result: float | None = data.get("result")
     return result
 
 
-def get_stock_price(stock: str) -> None | float:
+@profiled
+def get_stock_price(stock: str, timeout: float | None = QUOTES_REQUEST_TIMEOUT) -> None | float:
     """
     Функция получает цену акции в долларах по коду.
     Сервис: https://finnhub.io/docs/api/quote
 
     :param stock: Код акции
+    :param timeout: Таймаут запроса в секундах
     :return:
     """
 
     url = "https://api.finnhub.io/api/v1/quote?"
     params = {"symbol": stock, "token": os.getenv("FINNHUB_API")}
 
-    response = requests.get(url, params=params)
+    data = _get_quote_json(url, params, None, timeout)
 
-    if response.status_code != 200:
+    if data is None:
         return None
 
-    result: float | None = response.json().get("c")
+    result: float | None = data.get("c")
 
     return result
 
 
+def _get_quote_response(
+    url: str, params: dict, headers: dict | None, timeout: float | None
+) -> requests.Response | None:
+    """
+    Функция выполняет GET запрос котировки через общую сессию хоста
+    :param url: Адрес запроса
+    :param params: Параметры запроса
+    :param headers: Заголовки запроса
+    :param timeout: Таймаут запроса в секундах
+    :return: Ответ или None, если запрос не удался или не уложился в таймаут
+    """
+
+    try:
+        return get_session(url).get(url, params=params, headers=headers, timeout=timeout)
+    except (requests.RequestException, ValueError) as error:
+        # ValueError - недопустимый таймаут
+        logger.warning("Запрос %s не выполнен: %s", url, error)
+        return None
+
+
+def _get_quote_json(url: str, params: dict, headers: dict | None, timeout: float | None) -> dict | None:
+    """
+    Функция выполняет запрос котировки и разбирает ответ в формате JSON
+    :param url: Адрес запроса
+    :param params: Параметры запроса
+    :param headers: Заголовки запроса
+    :param timeout: Таймаут запроса в секундах
+    :return: Словарь из ответа или None, если запрос не удался или ответ не является объектом JSON
+    """
+
+    response = _get_quote_response(url, params, headers, timeout)
+    if response is None or response.status_code != 200:
+        return None
+
+    try:
+        data = response.json()
+    except ValueError as error:
+        # requests.JSONDecodeError - наследник ValueError
+        logger.warning("Ответ %s не в формате JSON: %s", url, error)
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+@profiled
 def get_dataframe_from_file(file_path: str) -> pd.DataFrame:
     """
-    Функция принимает путь до файла и возвращает Dataframe чтением файла
+    Функция принимает путь до файла и возвращает Dataframe чтением файла.
+    Файл считывается один раз, возвращается копия закэшированного DataFrame
     :param file_path:
     :return:
     """
-    return pd.read_excel(file_path)
+    return load_dataset(file_path).frame.copy()
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import DatasetCache, get_sidecar_path, read_sidecar, write_sidecar
+
+
+def test_dataset_cache(tmp_path):
+    file_path = os.path.join(tmp_path, "operations.xlsx")
+    pd.DataFrame({"Категория": ["Топливо"], "Сумма платежа": [-100.0]}).to_excel(file_path, index=False)
+
+    cache = DatasetCache()
+    dataset = cache.get(file_path)
+    assert cache.get(file_path) is dataset
+    assert dataset.records == [{"Категория": "Топливо", "Сумма платежа": -100.0}]
+    assert cache.stats() == {"hits": 1, "misses": 1, "reloads": 0, "size": 1}
+
+    pd.DataFrame({"Категория": ["Такси", None], "Сумма платежа": [-50.0, 10.0]}).to_excel(file_path, index=False)
+    os.utime(file_path, ns=(dataset.version[0] + 10**9, dataset.version[0] + 10**9))
+
+    reloaded = cache.get(file_path)
+    assert reloaded is not dataset
+    assert reloaded.records == [
+        {"Категория": "Такси", "Сумма платежа": -50.0},
+        {"Категория": None, "Сумма платежа": 10.0},
+    ]
+    assert cache.stats() == {"hits": 1, "misses": 1, "reloads": 1, "size": 1}
+
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "reloads": 0, "size": 0}
+
+
+def test_dataset_sidecar(tmp_path):
+    file_path = os.path.join(tmp_path, "operations.xlsx")
+    frame = pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Категория": ["Топливо", None],
+            "Сумма платежа": [-100.5, 20.0],
+            "Бонусы (включая кэшбэк)": [1, 0],
+        }
+    )
+    frame.to_excel(file_path, index=False)
+
+    from_excel = DatasetCache().get(file_path)
+    assert os.path.exists(os.path.join(get_sidecar_path(file_path), "manifest.json"))
+
+    from_sidecar = DatasetCache().get(file_path)
+    assert from_sidecar.frame.equals(from_excel.frame)
+    assert from_sidecar.records == from_excel.records
+    assert list(from_sidecar.dates("Дата операции")) == [
+        np.datetime64("2021-12-31T16:44:00"),
+        np.datetime64("2021-12-30T10:00:00"),
+    ]
+
+    # Числовые столбцы не копируются из memory map
+    sidecar_frame, _ = read_sidecar(file_path, from_excel.version)
+    amounts = sidecar_frame["Сумма платежа"].to_numpy()
+    assert isinstance(amounts.base, np.memmap) or isinstance(amounts, np.memmap)
+
+    assert read_sidecar(file_path, (0, 0)) is None
+
+
+def test_dataset_sidecar_unsupported(tmp_path):
+    file_path = os.path.join(tmp_path, "operations.xlsx")
+    frame = pd.DataFrame({"Сумма платежа": [-100.5, 20.0], "Смешанный": ["Топливо", 1.5]})
+
+    assert not write_sidecar(file_path, (1, 10), frame, {})
+    assert not os.path.exists(get_sidecar_path(file_path))
@@ -1,9 +1,15 @@
+import json
 import os
+import threading
+import time
 
 import pandas as pd
+import pytest
 
 from config import DATA_DIR
-from src.decorators import ReportSaver
+from src import decorators
+from src.dataset import Dataset
+from src.decorators import ReportSaver, cached, profiled, profiler, read_npz_report
 
 
 def test_deco():
@@ -13,8 +19,245 @@ def test_deco():
         return pd.DataFrame({"Test01": [0], "Test02": [1]})
 
     some_func()
-    created_file_path = os.path.join(DATA_DIR, "result_some_func.xls")
+    created_file_path = os.path.join(DATA_DIR, "result_some_func.xlsx")
     assert os.path.exists(created_file_path)
     assert pd.read_excel(created_file_path).to_dict("records") == [{"Test01": 0, "Test02": 1}]
     os.remove(created_file_path)
+    os.remove(f"{created_file_path}.sha256")
     assert not os.path.exists(created_file_path)
+
+
+def test_deco_background():
+
+    @ReportSaver.to_excel("result_{func}_bg.xls", background=True)
+    def some_func():
+        return pd.DataFrame({"Test01": [0], "Test02": [1]})
+
+    result = some_func()
+    write = ReportSaver.last_write()
+    result.loc[0, "Test01"] = 5
+    assert write.result(timeout=10) is True
+    assert ReportSaver.flush(timeout=10)
+
+    created_file_path = os.path.join(DATA_DIR, "result_some_func_bg.xlsx")
+    assert pd.read_excel(created_file_path).to_dict("records") == [{"Test01": 0, "Test02": 1}]
+    os.remove(created_file_path)
+    os.remove(f"{created_file_path}.sha256")
+
+    @ReportSaver.to_excel("missing_dir/result_{func}.xls", background=True)
+    def broken_func():
+        return pd.DataFrame({"Test01": [0]})
+
+    broken_func()
+    broken_write = ReportSaver.last_write()
+    assert broken_write is not write
+    assert ReportSaver.flush(timeout=10)
+    assert broken_write.exception() is not None
+
+    # Записи из другого потока не заменяют Future записи текущего потока
+    thread = threading.Thread(target=broken_func)
+    thread.start()
+    thread.join()
+    assert ReportSaver.flush(timeout=10)
+    assert ReportSaver.last_write() is broken_write
+
+
+def test_deco_background_same_file(tmp_path):
+    file_path = os.path.join(tmp_path, "report.csv")
+    active = []
+    overlaps = []
+
+    def slow_write(frame, path):
+        active.append(path)
+        overlaps.append(len(active))
+        time.sleep(0.05)
+        frame.to_csv(path, index=False)
+        active.remove(path)
+
+    futures = [
+        ReportSaver.submit(
+            lambda idx=idx: ReportSaver.write_report(pd.DataFrame({"Test01": [idx]}), file_path, slow_write, True),
+            file_path,
+        )
+        for idx in range(4)
+    ]
+    assert all(future.result(timeout=10) for future in futures)
+    assert max(overlaps) == 1
+
+
+def test_deco_formats(monkeypatch):
+    frame = pd.DataFrame(
+        {
+            "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-30 10:00:00"]),
+            "Категория": ["Топливо", None],
+            "Сумма платежа": [-100.5, 20.0],
+        }
+    )
+
+    @ReportSaver.to_csv()
+    @ReportSaver.to_jsonl()
+    @ReportSaver.to_npz()
+    def some_func():
+        return frame
+
+    some_func()
+
+    csv_path = os.path.join(DATA_DIR, "result_some_func.csv")
+    assert pd.read_csv(csv_path)["Сумма платежа"].tolist() == [-100.5, 20.0]
+
+    jsonl_path = os.path.join(DATA_DIR, "result_some_func.jsonl")
+    with open(jsonl_path, encoding="utf8") as file:
+        lines = [json.loads(line) for line in file]
+    assert [line["Категория"] for line in lines] == ["Топливо", None]
+
+    npz_path = os.path.join(DATA_DIR, "result_some_func.npz")
+    assert read_npz_report(npz_path).equals(frame)
+
+    # Большие DataFrame записываются в excel построчно
+    monkeypatch.setattr(decorators, "EXCEL_STREAMING_ROWS", 1)
+    monkeypatch.setattr(decorators, "REPORT_CHUNK_ROWS", 1)
+    ReportSaver.to_excel()(some_func)()
+
+    xlsx_path = os.path.join(DATA_DIR, "result_some_func.xlsx")
+    saved = pd.read_excel(xlsx_path)
+    assert saved["Категория"].tolist()[0] == "Топливо" and pd.isna(saved["Категория"].tolist()[1])
+    assert saved["Дата операции"].tolist() == frame["Дата операции"].tolist()
+
+    for file_path in (csv_path, jsonl_path, npz_path, xlsx_path):
+        os.remove(file_path)
+        os.remove(f"{file_path}.sha256")
+
+
+def test_deco_skip_unchanged():
+    frame = pd.DataFrame({"Test01": [0], "Test02": [1]})
+
+    @ReportSaver.to_csv()
+    def some_func():
+        return frame
+
+    created_file_path = os.path.join(DATA_DIR, "result_some_func.csv")
+    before = ReportSaver.stats()
+
+    some_func()
+    modified_at = os.stat(created_file_path).st_mtime_ns
+    some_func()
+    assert os.stat(created_file_path).st_mtime_ns == modified_at
+
+    frame.loc[0, "Test01"] = 5
+    some_func()
+    assert pd.read_csv(created_file_path).to_dict("records") == [{"Test01": 5, "Test02": 1}]
+
+    stats = ReportSaver.stats()
+    assert stats["written"] - before["written"] == 2
+    assert stats["skipped"] - before["skipped"] == 1
+
+    # Прерванная запись не оставляет хэш, и следующий вызов записывает файл заново
+    def broken_write(frame, file_path):
+        open(file_path, "w").close()
+        raise OSError("Нет места на диске")
+
+    with pytest.raises(OSError):
+        ReportSaver.write_report(frame.assign(Test02=2), created_file_path, broken_write, skip_unchanged=True)
+    some_func()
+    assert pd.read_csv(created_file_path).to_dict("records") == [{"Test01": 5, "Test02": 1}]
+
+    os.remove(created_file_path)
+    os.remove(f"{created_file_path}.sha256")
+
+
+def test_cached(tmp_path):
+    file_path = os.path.join(tmp_path, "operations.csv")
+    with open(file_path, "w", encoding="utf8") as file:
+        file.write("1")
+    calls = []
+
+    @cached(max_entries=2, path_arg="file_path")
+    def read_value(key, file_path):
+        calls.append(key)
+        with open(file_path, encoding="utf8") as file:
+            return [{"key": key, "value": file.read()}]
+
+    assert read_value("a", file_path) == [{"key": "a", "value": "1"}]
+    read_value(key="a", file_path=file_path)[0]["value"] = "changed"
+    assert read_value("a", file_path=file_path) == [{"key": "a", "value": "1"}]
+    assert calls == ["a"]
+
+    # Вытесняется давно не использованный результат
+    read_value("b", file_path)
+    read_value("c", file_path)
+    read_value("a", file_path)
+    assert calls == ["a", "b", "c", "a"]
+
+    # Изменение файла сбрасывает результаты
+    with open(file_path, "w", encoding="utf8") as file:
+        file.write("22")
+    assert read_value("a", file_path) == [{"key": "a", "value": "22"}]
+
+    stats = read_value.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 5, 3, 2)
+
+
+def test_cached_dataframe():
+    calls = []
+
+    @cached()
+    def total(frame, column):
+        calls.append(column)
+        return frame[column].sum()
+
+    frame = pd.DataFrame({"Сумма": [1, 2]})
+    assert total(frame, "Сумма") == 3
+    assert total(frame.copy(), "Сумма") == 3
+    assert total(pd.DataFrame({"Сумма": [1, 5]}), "Сумма") == 6
+    assert calls == ["Сумма", "Сумма"]
+
+    # Изменённый на месте DataFrame получает новый ключ
+    frame.loc[1, "Сумма"] = 7
+    assert total(frame, "Сумма") == 8
+    assert calls == ["Сумма", "Сумма", "Сумма"]
+
+
+def test_cached_dataset():
+    calls = []
+
+    @cached()
+    def total(dataset, column):
+        calls.append(dataset.version)
+        return dataset.frame[column].sum()
+
+    frame = pd.DataFrame({"Сумма": [1, 2]})
+    assert total(Dataset("operations.xlsx", (1, 10), frame), "Сумма") == 3
+    assert total(Dataset("operations.xlsx", (1, 10), frame.copy()), "Сумма") == 3
+    assert total(Dataset("operations.xlsx", (2, 10), frame.assign(Сумма=[1, 5])), "Сумма") == 6
+    assert calls == [(1, 10), (2, 10)]
+
+
+def test_profiled(tmp_path):
+
+    @profiled
+    def some_func(size):
+        return [0] * size
+
+    name = f"{__name__}.test_profiled.<locals>.some_func"
+    some_func(10)
+    assert name not in profiler.dump()
+
+    profiler.enable(trace_memory=True)
+    try:
+        for size in (10, 100_000):
+            some_func(size)
+    finally:
+        profiler.disable()
+
+    stats = profiler.dump(os.path.join(tmp_path, "profile.json"))[name]
+    assert stats["count"] == 2
+    assert set(stats["wall"]) == {"p50", "p95", "p99", "max"}
+    assert stats["wall"]["p50"] <= stats["wall"]["p99"] <= stats["wall"]["max"]
+    # Список из 100 000 ссылок занимает около 800 КБ
+    assert stats["memory_peak"]["max"] >= 100_000 * 4
+
+    with open(os.path.join(tmp_path, "profile.json"), encoding="utf8") as file:
+        assert json.load(file)[name]["count"] == 2
+
+    profiler.reset()
+    assert profiler.dump() == {}
@@ -0,0 +1,151 @@
+import logging
+import os
+import queue
+import threading
+
+import pytest
+
+from src.my_logger import LOG_QUEUE_SIZE, BoundedQueueHandler, Logger, flush_queue
+
+
+def test_logger_queued(tmp_path):
+    logger = Logger("test_queued", save_dir=str(tmp_path), queued=True).on_duty()
+    logger.info("Операций: %s", 3)
+    flush_queue()
+
+    with open(os.path.join(tmp_path, "test_queued.log"), encoding="utf8") as file:
+        assert file.read() == "test_queued - test_logger_queued: Операций: 3\n"
+
+
+def test_logger_queued_mutable_args(tmp_path):
+    queued = Logger("test_mutable", save_dir=str(tmp_path), queued=True)
+    logger = queued.on_duty()
+    result = {"Операций": 3}
+
+    # Пока файловый обработчик занят, записи ждут в очереди
+    queued.handler.acquire()
+    try:
+        logger.info(result)
+        logger.info("Результат: %s", result)
+        result["Операций"] = 4
+    finally:
+        queued.handler.release()
+    flush_queue()
+
+    with open(os.path.join(tmp_path, "test_mutable.log"), encoding="utf8") as file:
+        assert file.read().splitlines() == [
+            "test_mutable - test_logger_queued_mutable_args: {'Операций': 3}",
+            "test_mutable - test_logger_queued_mutable_args: Результат: {'Операций': 3}",
+        ]
+
+
+def test_logger_queued_overflow(tmp_path):
+    queued = Logger("test_overflow", save_dir=str(tmp_path), queued=True, overflow="drop_oldest")
+    logger = queued.on_duty()
+
+    # Пока файловый обработчик занят, фоновый поток не разбирает очередь и она переполняется
+    queued.handler.acquire()
+    try:
+        for idx in range(LOG_QUEUE_SIZE + 10):
+            logger.info("Запись %s", idx)
+    finally:
+        queued.handler.release()
+
+    flushing = threading.Thread(target=flush_queue, daemon=True)
+    flushing.start()
+    flushing.join(timeout=10)
+    assert not flushing.is_alive()
+
+    queued.close()
+    with open(os.path.join(tmp_path, "test_overflow.log"), encoding="utf8") as file:
+        last_line = file.read().splitlines()[-1]
+    assert last_line == f"test_overflow - test_logger_queued_overflow: Запись {LOG_QUEUE_SIZE + 9}"
+
+
+def test_bounded_queue_handler():
+    def make_record(message, level=logging.INFO):
+        return logging.LogRecord("test", level, __file__, 0, message, None, None)
+
+    drop_new = BoundedQueueHandler(queue.Queue(maxsize=1))
+    drop_new.handle(make_record("first"))
+    drop_new.handle(make_record("second"))
+    assert drop_new.dropped == 1
+    assert drop_new.log_queue.get_nowait().msg == "first"
+
+    drop_oldest = BoundedQueueHandler(queue.Queue(maxsize=1), overflow="drop_oldest")
+    drop_oldest.handle(make_record("first"))
+    drop_oldest.handle(make_record("second"))
+    assert drop_oldest.dropped == 1
+    assert drop_oldest.log_queue.get_nowait().msg == "second"
+
+
+def test_logger_idempotent(tmp_path):
+    first = Logger("test_idempotent", save_dir=str(tmp_path))
+    second = Logger("test_idempotent", save_dir=str(tmp_path))
+    logger = second.on_duty()
+
+    assert first.handler is second.handler
+    assert logger.handlers.count(second.handler) == 1
+
+    logger.info("Одна запись")
+    second.close()
+    assert second.handler not in logger.handlers
+    assert second.handler.stream is None
+
+    with open(os.path.join(tmp_path, "test_idempotent.log"), encoding="utf8") as file:
+        assert file.read() == "test_idempotent - test_logger_idempotent: Одна запись\n"
+
+    reopened = Logger("test_idempotent", save_dir=str(tmp_path), mode="a")
+    assert reopened.handler is not second.handler
+    reopened.close()
+
+
+def test_logger_buffered(tmp_path):
+    buffered = Logger("test_buffered", save_dir=str(tmp_path), buffered=True, flush_interval=60)
+    logger = buffered.on_duty()
+    log_path = os.path.join(tmp_path, "test_buffered.log")
+
+    logger.info("В буфере")
+    assert os.path.getsize(log_path) == 0
+
+    logger.error("Ошибка")
+    with open(log_path, encoding="utf8") as file:
+        assert file.read().splitlines() == [
+            "test_buffered - test_logger_buffered: В буфере",
+            "test_buffered - test_logger_buffered: Ошибка",
+        ]
+    buffered.close()
+
+
+def test_logger_rotation(tmp_path):
+    rotated = Logger("test_rotation", save_dir=str(tmp_path), rotation="size", max_bytes=100, backup_count=2)
+    logger = rotated.on_duty()
+
+    for idx in range(20):
+        logger.info("Запись %s", idx)
+    rotated.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["test_rotation.log", "test_rotation.log.1", "test_rotation.log.2"]
+    assert all(os.path.getsize(os.path.join(tmp_path, name)) <= 100 for name in os.listdir(tmp_path))
+
+
+def test_logger_switch_queued(tmp_path):
+    direct = Logger("test_switch", save_dir=str(tmp_path))
+    logger = Logger("test_switch", save_dir=str(tmp_path), queued=True).on_duty()
+    logger.info("Через очередь")
+    flush_queue()
+
+    Logger("test_switch", save_dir=str(tmp_path))
+    logger.info("Напрямую")
+    direct.close()
+
+    with open(os.path.join(tmp_path, "test_switch.log"), encoding="utf8") as file:
+        assert file.read().splitlines() == [
+            "test_switch - test_logger_switch_queued: Через очередь",
+            "test_switch - test_logger_switch_queued: Напрямую",
+        ]
+
+    Logger("test_switch", save_dir=str(tmp_path), mode="a")
+    with pytest.raises(ValueError):
+        Logger("test_switch", save_dir=str(tmp_path), buffered=True)
+    Logger("test_switch", save_dir=str(tmp_path), mode="a").close()
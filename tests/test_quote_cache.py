@@ -0,0 +1,29 @@
+import time
+
+from src.quote_cache import QuoteCache
+
+
+def test_quote_cache():
+    cache = QuoteCache()
+    prices = iter([10.0, 20.0, 30.0])
+
+    assert cache.get(("AAPL", "USD"), lambda: next(prices), ttl=60) == 10.0
+    assert cache.get(("AAPL", "USD"), lambda: next(prices), ttl=60) == 10.0
+    assert cache.get(("MSFT", "USD"), lambda: None, ttl=60) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["refreshes"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_quote_cache_stale():
+    cache = QuoteCache()
+    prices = iter([10.0, 20.0, 30.0])
+
+    assert cache.get("USD", lambda: next(prices), ttl=0) == 10.0
+    # Устаревшее значение возвращается сразу, обновление идёт в фоне
+    assert cache.get("USD", lambda: next(prices), ttl=0) == 10.0
+    time.sleep(0.1)
+    assert cache.stats()["stale_hits"] == 1
+    # После max_staleness вызывающий ждёт нового значения
+    assert cache.get("USD", lambda: next(prices), ttl=0, max_staleness=0) == 30.0
@@ -1,6 +1,8 @@
+import pandas as pd
 from pandas import Timestamp
 
-from src.reports import spending_by_category
+from src.dataset import Dataset
+from src.reports import spending_by_categories, spending_by_category, spending_by_category_rolling
 
 
 def test_spending_by_category(dataframe_dat_cat):
@@ -9,3 +11,62 @@ def test_spending_by_category(dataframe_dat_cat):
         {"Дата операции": Timestamp("2000-01-04 00:00:00"), "Категория": "Топливо"},
     ]
     assert spending_by_category(dataframe_dat_cat, "Топливо").to_dict("records") == []
+
+
+def test_spending_by_category_keeps_input(dataframe_dat_cat):
+    original = dataframe_dat_cat.copy()
+
+    result = spending_by_category(dataframe_dat_cat, "Топливо", "1.02.2000")
+    assert dataframe_dat_cat.equals(original)
+    assert result.index.tolist() == [0, 3]
+
+
+def test_spending_by_categories(dataframe_dat_cat):
+    assert spending_by_categories(dataframe_dat_cat, ["Топливо", "Переводы"], ["1.02.2000", "3.01.2000"]).to_dict(
+        "records"
+    ) == [
+        {"Дата отчёта": "1.02.2000", "Дата операции": Timestamp("2000-01-01 00:00:00"), "Категория": "Топливо"},
+        {"Дата отчёта": "1.02.2000", "Дата операции": Timestamp("2000-01-04 00:00:00"), "Категория": "Топливо"},
+        {"Дата отчёта": "1.02.2000", "Дата операции": Timestamp("2000-01-05 00:00:00"), "Категория": "Переводы"},
+        {"Дата отчёта": "3.01.2000", "Дата операции": Timestamp("2000-01-01 00:00:00"), "Категория": "Топливо"},
+    ]
+
+
+def test_spending_by_categories_changed_frame(dataframe_dat_cat):
+    before = spending_by_categories(dataframe_dat_cat, ["Топливо"], ["1.02.2000"])
+    assert before["Дата операции"].tolist() == [Timestamp("2000-01-01"), Timestamp("2000-01-04")]
+
+    assert len(spending_by_category(dataframe_dat_cat, "Топливо", "10.01.2000")) == 2
+
+    dataframe_dat_cat.loc[1, "Категория"] = "Топливо"
+    assert len(spending_by_category(dataframe_dat_cat, "Топливо", "10.01.2000")) == 3
+    after = spending_by_categories(dataframe_dat_cat, ["Топливо"], ["1.02.2000"])
+    assert after["Дата операции"].tolist() == [
+        Timestamp("2000-01-01"),
+        Timestamp("2000-01-02"),
+        Timestamp("2000-01-04"),
+    ]
+
+
+def test_spending_by_category_dataset(dataframe_dat_cat):
+    dataset = Dataset("operations.xlsx", (0, 0), dataframe_dat_cat)
+
+    assert spending_by_categories(dataset, ["Топливо"], ["1.02.2000"]).to_dict("records") == spending_by_categories(
+        dataframe_dat_cat, ["Топливо"], ["1.02.2000"]
+    ).to_dict("records")
+    assert "reports.category_index" in dataset._derived
+
+
+def test_spending_by_category_rolling(dataframe_dat_cat):
+    transactions = dataframe_dat_cat.assign(**{"Сумма платежа": [-10.5, -20.0, -30.0, -40.25, -50.0, -60.0]})
+    rolling = spending_by_category_rolling(
+        transactions, ["Топливо", "Переводы", "Нет такой"], "1.01.2000", "6.01.2000"
+    )
+
+    assert rolling["Дата"].tolist() == list(pd.date_range("2000-01-01", "2000-01-06"))
+    assert rolling["Топливо"].tolist() == [-10.5, -10.5, -10.5, -50.75, -50.75, -50.75]
+    assert rolling["Переводы"].tolist() == [0, 0, 0, 0, -50.0, -50.0]
+    assert rolling["Нет такой"].tolist() == [0] * 6
+
+    for day, total in zip(rolling["Дата"], rolling["Топливо"]):
+        assert total == spending_by_category(transactions, "Топливо", day.strftime("%d.%m.%Y"))["Сумма платежа"].sum()
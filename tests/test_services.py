@@ -1,6 +1,9 @@
 import pytest
 
-from src.services import search_by_persons, simple_searching
+from config import OP_DATA_DIR
+from src.services import (batch_searching, get_person_transfers, get_person_transfers_sum, get_top_recipients,
+                          search_by_persons, simple_searching)
+from src.utils import read_file_data
 
 
 @pytest.mark.parametrize(
@@ -77,5 +80,48 @@ def test_simple_searching(cat_search_results):
     assert simple_searching("Райффайзенбанк") == cat_search_results
 
 
+@pytest.mark.parametrize("search_field", [" ", "ка", "ПЕРЕВОД", "Яндекс Такси", "нет такой строки"])
+def test_simple_searching_as_scan(search_field):
+    expected = [
+        op
+        for op in read_file_data(OP_DATA_DIR)
+        if search_field.lower() in (op["Категория"] or " ").lower()
+        or search_field.lower() in (op["Описание"] or " ").lower()
+    ]
+    assert simple_searching(search_field) == expected
+
+
+def test_batch_searching():
+    search_fields = ["Райффайзенбанк", "такси", " ", "", "нет такой строки"]
+
+    assert batch_searching(search_fields) == {field: simple_searching(field) for field in search_fields}
+
+
 def test_search_by_persons(persons_search_result):
     assert search_by_persons()[:5] == persons_search_result
+
+
+def test_search_by_persons_recipient(persons_search_result):
+    result = search_by_persons(with_recipient=True)[:5]
+    recipients = [op.pop("Получатель") for op in result]
+
+    assert result == persons_search_result
+    assert recipients == [op["Описание"] for op in persons_search_result]
+
+
+def test_recipient_index():
+    top = get_top_recipients(3)
+    assert [item["recipient"] for item in top] == ["Иван С.", "Николай Н.", "Сергей З."]
+
+    transfers = get_person_transfers("Иван С.")
+    assert len(transfers) == top[0]["count"]
+    assert all(op in search_by_persons() for op in transfers)
+
+    sent_ops = [op for op in transfers if op["Статус"] == "OK" and op["Сумма платежа"] < 0]
+    assert get_person_transfers_sum("Иван С.") == top[0]["amount"] == -sum(op["Сумма платежа"] for op in sent_ops)
+    assert get_person_transfers_sum("Иван С.", "01.01.2021", "31.12.2021") == sum(
+        -op["Сумма платежа"] for op in transfers if op["Дата операции"][6:10] == "2021" and op in sent_ops
+    )
+
+    assert get_person_transfers("Никто Н.") == []
+    assert get_person_transfers_sum("Никто Н.") == 0
@@ -0,0 +1,10 @@
+from src.utils import AhoCorasick
+
+
+def test_aho_corasick():
+    automaton = AhoCorasick(["he", "she", "his", "hers", "такси"])
+
+    assert automaton.find("ushers") == {0, 1, 3}
+    assert automaton.find("яндекс такси") == {4}
+    assert automaton.find("ничего") == set()
+    assert AhoCorasick([]).find("text") == set()
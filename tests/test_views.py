@@ -1,10 +1,20 @@
+import time
 from unittest.mock import patch
 
-from src.views import (get_currency_stocks, get_expences_categories, get_expences_income, get_income_categories,
-                       get_operations_by_date_range, post_events_response)
+import requests
+from pytest import fixture
 
+from src.views import (get_currency_rates, get_currency_stocks, get_expences_categories, get_expences_income,
+                       get_expences_income_by_date_range, get_income_categories, get_operations_by_date_range,
+                       post_events_response, quote_cache)
 
-@patch("requests.get")
+
+@fixture(autouse=True)
+def clear_quote_cache():
+    quote_cache.clear()
+
+
+@patch("requests.Session.get")
 def test_post_events_response(get_mock, post_events_response_result, post_events_response_result_none):
     mock_file = get_mock.return_value
 
@@ -12,9 +22,55 @@ def test_post_events_response(get_mock, post_events_response_result, post_events
     mock_file.json.return_value = {"result": 99.42, "c": 99.42}
     assert post_events_response("01.10.2018", "W") == post_events_response_result
     mock_file.status_code = 400
+    assert post_events_response("01.10.2018", "W") == post_events_response_result
+
+    quote_cache.clear()
     assert post_events_response("01.10.2018", "W") == post_events_response_result_none
 
 
+@patch("requests.Session.get")
+def test_post_events_response_not_json(get_mock, post_events_response_result_none):
+    get_mock.return_value.status_code = 200
+    get_mock.return_value.json.side_effect = requests.JSONDecodeError("Expecting value", "<html>", 0)
+
+    quote_cache.clear()
+    assert post_events_response("01.10.2018", "W") == post_events_response_result_none
+
+
+@patch("src.views.get_cached_stock_price", side_effect=RuntimeError("Ошибка запроса"))
+@patch("src.views.get_cached_currency_rates", return_value={"USD": 99.42, "EUR": 99.42})
+def test_get_currency_stocks_failed(rates_mock, stock_mock):
+    currency_list, stocks_list = get_currency_stocks(use_cache=False)
+    assert currency_list[0] == {"currency": "USD", "rate": 99.42}
+    assert stocks_list[0] == {"stock": "AAPL", "price": None, "status": "unavailable"}
+    assert len(stocks_list) == stock_mock.call_count
+
+
+def test_post_events_response_overlap(cur_stocks_result):
+    def slow_quotes(*args, **kwargs):
+        time.sleep(0.3)
+        return cur_stocks_result
+
+    def slow_local(*args):
+        time.sleep(0.3)
+        return {}, {}
+
+    with (
+        patch("src.views.get_currency_stocks", slow_quotes),
+        patch("src.views.get_expences_income_by_date_range", slow_local),
+    ):
+        started = time.perf_counter()
+        result = post_events_response("01.10.2018", "W")
+        assert time.perf_counter() - started < 0.55
+
+    assert result == {
+        "expences": {},
+        "income": {},
+        "currency_rates": cur_stocks_result[0],
+        "stock_prices": cur_stocks_result[1],
+    }
+
+
 def test_get_income_categories():
     incomes = {"Зарплата": 1000, "Подарок": 2000}
 
@@ -32,7 +88,14 @@ def test_get_expences_income(operations_m, expenses_income_results):
     )
 
 
-@patch("requests.get")
+def test_get_expences_income_by_date_range(expenses_income_results):
+    assert get_expences_income_by_date_range("01.10.2018") == expenses_income_results
+    assert get_expences_income_by_date_range("01.02.2018", "ALL") == get_expences_income(
+        get_operations_by_date_range("01.02.2018", "ALL")
+    )
+
+
+@patch("requests.Session.get")
 def test_get_currency_stocks(get_mock, cur_stocks_result):
     mock_file = get_mock.return_value
 
@@ -42,6 +105,87 @@ def test_get_currency_stocks(get_mock, cur_stocks_result):
     assert get_currency_stocks() == cur_stocks_result
 
 
+@patch("requests.Session.get")
+def test_get_currency_stocks_concurrent(get_mock, cur_stocks_result):
+    def slow_get(*args, **kwargs):
+        time.sleep(0.2)
+        return get_mock.return_value
+
+    get_mock.side_effect = slow_get
+    get_mock.return_value.status_code = 200
+    get_mock.return_value.json.return_value = {"result": 99.42, "c": 99.42}
+
+    started = time.perf_counter()
+    assert get_currency_stocks() == cur_stocks_result
+    assert time.perf_counter() - started < 0.2 * 7
+
+    assert get_currency_stocks(max_workers=1) == cur_stocks_result
+
+
+@patch("requests.Session.get")
+def test_get_currency_stocks_batch(get_mock):
+    get_mock.return_value.status_code = 200
+    get_mock.return_value.json.return_value = {"rates": {"USD": 0.01, "EUR": 0.008}, "c": 99.42}
+
+    currency_list, stocks_list = get_currency_stocks()
+    assert currency_list == [{"currency": "USD", "rate": 100.0}, {"currency": "EUR", "rate": 125.0}]
+    # Один запрос на все валюты и по одному на каждую акцию
+    assert get_mock.call_count == 1 + len(stocks_list)
+
+
+@patch("requests.Session.get")
+def test_post_events_response_deadline(get_mock, post_events_response_result):
+    def get(url, *args, **kwargs):
+        # Котировки акций "зависают"
+        if "finnhub" in url:
+            time.sleep(1)
+        return get_mock.return_value
+
+    get_mock.side_effect = get
+    get_mock.return_value.status_code = 200
+    get_mock.return_value.json.return_value = {"result": 99.42}
+
+    started = time.perf_counter()
+    result = post_events_response("01.10.2018", "W", deadline=0.3)
+    assert time.perf_counter() - started < 1
+
+    assert result["expences"] == post_events_response_result["expences"]
+    assert result["currency_rates"] == post_events_response_result["currency_rates"]
+    assert result["stock_prices"][0] == {"stock": "AAPL", "price": None, "status": "unavailable"}
+
+
+@patch("requests.Session.get")
+def test_get_currency_stocks_cancelled(get_mock):
+    def get(*args, **kwargs):
+        time.sleep(0.3)
+        return get_mock.return_value
+
+    get_mock.side_effect = get
+    get_mock.return_value.status_code = 200
+    get_mock.return_value.json.return_value = {"rates": {"USD": 0.01, "EUR": 0.008}, "c": 99.42}
+
+    # Запросы выполняются по одному, запросы акций не успевают начаться
+    currency_list, stocks_list = get_currency_stocks(max_workers=1, use_cache=False, timeout=0.1)
+    assert currency_list[0] == {"currency": "USD", "rate": None, "status": "unavailable"}
+    assert all(stock["status"] == "unavailable" for stock in stocks_list)
+
+
+@patch("requests.Session.get")
+def test_get_currency_rates_batch_timeout(get_mock):
+    def get(url, *args, timeout=None, **kwargs):
+        # Пакетный запрос расходует всё время
+        time.sleep(timeout)
+        raise requests.Timeout()
+
+    get_mock.side_effect = get
+
+    assert get_currency_rates(["USD", "EUR"], timeout=0.1) == {}
+    assert get_mock.call_count == 1
+
+    currency_list, _ = get_currency_stocks(use_cache=False, timeout=0.3)
+    assert currency_list[0] == {"currency": "USD", "rate": None, "status": "unavailable"}
+
+
 def test_get_expences_categories():
     expences = {
         "Топливо": 1000,